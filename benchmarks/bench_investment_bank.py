@@ -0,0 +1,64 @@
+"""Сравнение старой построчной и векторной Инвесткопилки.
+
+Запуск: python -m benchmarks.bench_investment_bank [число_операций]
+"""
+
+import json
+import logging
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.services import calculate_rounding_amount, investment_bank, parse_date
+
+
+def legacy_investment_bank(month: str, all_transactions: List[Dict[str, Any]], limit: int) -> str:
+    """Построчная реализация до векторизации, для сравнения"""
+    total_sum = Decimal("0.00")
+    for transaction in all_transactions:
+        transaction_date = parse_date(transaction["Дата операции"])
+        if transaction_date.strftime("%Y-%m") == month:
+            rounding_amount = calculate_rounding_amount(transaction["Сумма операции"], limit)
+            total_sum += Decimal(str(rounding_amount))
+            logging.info(
+                f"Transaction Date: {transaction_date},"
+                f" Amount: {transaction['Сумма операции']}, Rounding Amount: {rounding_amount}"
+            )
+
+    result = total_sum.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    response = {"month": month, "total_savings": float(result)}
+    return json.dumps(response, ensure_ascii=False, indent=4)
+
+
+def make_transactions(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Случайные операции за 2021 год"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit="s")
+    amounts = rng.integers(1, 5_000_000, rows) / 100
+    return pd.DataFrame({"Дата операции": dates.strftime("%Y-%m-%d"), "Сумма операции": amounts})
+
+
+def main(rows: int) -> None:
+    frame = make_transactions(rows)
+    records = frame.to_dict(orient="records")
+
+    start = time.perf_counter()
+    expected = legacy_investment_bank("2021-10", records, 100)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = investment_bank("2021-10", frame, 100)
+    vectorized_time = time.perf_counter() - start
+
+    assert result == expected, (result, expected)
+    print(f"operations: {rows}")
+    print(f"legacy:     {legacy_time:.3f} s")
+    print(f"vectorized: {vectorized_time:.3f} s ({legacy_time / vectorized_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
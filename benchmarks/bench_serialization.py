@@ -0,0 +1,79 @@
+"""Сравнение прежней сериализации отчетов через json.dumps и to_json со слоем src.serialization.
+
+Запуск: python -m benchmarks.bench_serialization [число_операций]
+"""
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from benchmarks.synthetic import make_operations
+from src.serialization import dumps, frame_json
+from src.store import categories_window
+from src.views import build_analytics
+
+MARKET = {
+    "currency_rates": [{"currency": "USD", "rate": 73.21}, {"currency": "EUR", "rate": 87.08}],
+    "stock_prices": [{"stock": "AAPL", "price": 150.12}, {"stock": "AMZN", "price": 3173.18}],
+}
+
+
+def legacy_categories(windows: Dict[str, pd.DataFrame]) -> bytes:
+    """Прежняя склейка отчета по нескольким категориям из строк to_json"""
+    parts = [
+        f"{json.dumps(category, ensure_ascii=False)}:{filtered.to_json(orient='records', force_ascii=False)}"
+        for category, filtered in windows.items()
+    ]
+    return ("{" + ",".join(parts) + "}").encode("utf-8")
+
+
+def make_cases(rows: int) -> List[Tuple[str, Callable[[], bytes], Callable[[], bytes], bool]]:
+    """Пары (прежний способ, новый слой) и признак побайтового совпадения"""
+    frame = make_operations(rows)
+    end = frame["Дата операции"].max()
+    windows = categories_window(frame, ["Супермаркеты", "Фастфуд", "Такси"], end - pd.DateOffset(months=3), end)
+    window = windows["Супермаркеты"]
+    report = {**build_analytics(frame, end.strftime("%Y-%m-%d %H:%M:%S")), **MARKET}
+
+    return [
+        ("report pretty", lambda: json.dumps(report, ensure_ascii=False, indent=4).encode("utf-8"),
+         lambda: dumps(report, pretty=True), True),
+        ("report compact", lambda: json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+         lambda: dumps(report), True),
+        ("category", lambda: window.to_json(orient="records", force_ascii=False).encode("utf-8"),
+         lambda: frame_json(window), True),
+        ("category pretty", lambda: json.dumps(
+            json.loads(window.to_json(orient="records", force_ascii=False)), ensure_ascii=False, indent=4
+        ).encode("utf-8"), lambda: frame_json(window, pretty=True), False),
+        ("categories", lambda: legacy_categories(windows), lambda: dumps(windows), True),
+    ]
+
+
+def best_time(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Лучшее время из repeat запусков"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(rows: int) -> None:
+    print(f"operations: {rows}")
+    for name, legacy, layer, same_bytes in make_cases(rows):
+        expected, result = legacy(), layer()
+        # Прежний json.dumps писал NaN, что не является JSON; слой пишет null
+        assert json.loads(result) == json.loads(expected, parse_constant=lambda constant: None), name
+        if same_bytes and b"NaN" not in expected:
+            assert result == expected, name
+        legacy_time, layer_time = best_time(legacy), best_time(layer)
+        print(f"{name:<16} legacy {legacy_time * 1000:9.2f} ms {len(expected):>11} B   "
+              f"layer {layer_time * 1000:9.2f} ms {len(result):>11} B ({legacy_time / layer_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
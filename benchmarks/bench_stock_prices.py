@@ -0,0 +1,36 @@
+"""Сравнение последовательного и параллельного получения цен акций на фейковом источнике.
+
+Запуск: python -m benchmarks.bench_stock_prices [задержка_мс]
+"""
+
+import sys
+import time
+
+from src.market import QuoteProvider
+from src.utils import get_stock_prices
+
+STOCKS = ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA", "NVDA", "META", "NFLX"]
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """Источник с фиксированной сетевой задержкой на каждый запрос"""
+
+    def __init__(self, latency: float, max_workers: int) -> None:
+        self.latency = latency
+        self.max_workers = max_workers
+
+    def get_close_price(self, symbol: str) -> float:
+        time.sleep(self.latency)
+        return 100.0 + len(symbol)
+
+
+def main(latency_ms: float) -> None:
+    for workers in (1, len(STOCKS)):
+        provider = FakeQuoteProvider(latency_ms / 1000, workers)
+        start = time.perf_counter()
+        get_stock_prices(STOCKS, provider)
+        print(f"workers={workers}: {time.perf_counter() - start:.3f} s for {len(STOCKS)} stocks")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 200)
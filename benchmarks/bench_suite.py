@@ -0,0 +1,175 @@
+"""Замеры времени и пиковой памяти основных функций на синтетических данных.
+
+Запуск: python -m benchmarks.bench_suite [--rows 10k,1m,10m] [--repeat 3] [--save] [--compare]
+
+--save записывает результаты в benchmarks/baselines.json, --compare сравнивает с ними
+и завершается с кодом 1, если время или память выросли больше допуска.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.synthetic import make_operations, write_xlsx
+from src.reports import spending_by_category
+from src.services import investment_bank
+from src.store import build_category_index
+from src.utils import (calculate_card_stats, filter_transactions, from_xlsx, get_investment_frame,
+                       get_top_transactions, reload_transactions)
+from src.views import generate_report, invalidate_report_cache
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+# Запись и чтение эксель-файла на миллионах строк занимают минуты, from_xlsx меряется до этого размера
+XLSX_MAX_ROWS = 100_000
+
+MARKET_STUBS = {
+    "src.views.load_user_settings": {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "AMZN"]},
+    "src.views.get_currency_rates": [{"currency": "USD", "rate": 73.21}, {"currency": "EUR", "rate": 87.08}],
+    "src.views.get_stock_prices": [{"stock": "AAPL", "price": 150.12}, {"stock": "AMZN", "price": 3173.18}],
+}
+
+
+def parse_rows(value: str) -> int:
+    """Число строк из записи вида 10k, 1m или 10000"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    value = value.strip().lower()
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Лучшее время из repeat запусков после прогревочного и пиковая память запуска под tracemalloc"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": round(min(timings), 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def _report(frame: pd.DataFrame, datetime_str: str) -> str:
+    """Главная страница с холодным кэшем отчета и подмененными рыночными данными"""
+    reload_transactions(frame)
+    invalidate_report_cache()
+    return generate_report(datetime_str)
+
+
+def make_benchmarks(frame: pd.DataFrame, workdir: Path) -> Dict[str, Callable[[], Any]]:
+    """Функции для замера на одном наборе операций"""
+    end = frame["Дата операции"].max()
+    datetime_str = end.strftime("%Y-%m-%d %H:%M:%S")
+    filtered = filter_transactions(frame, datetime_str)
+    reload_transactions(frame)
+    investment_frame = get_investment_frame()
+    category_index = build_category_index(frame)
+
+    benchmarks: Dict[str, Callable[[], Any]] = {}
+    if len(frame) <= XLSX_MAX_ROWS:
+        xlsx_path = write_xlsx(frame, workdir / "operations.xlsx")
+
+        def read_xlsx() -> Any:
+            with patch("src.utils.path_xlsx", str(xlsx_path)):
+                return from_xlsx()
+
+        benchmarks["from_xlsx"] = read_xlsx
+    benchmarks.update({
+        "filter_transactions": lambda: filter_transactions(frame, datetime_str),
+        "calculate_card_stats": lambda: calculate_card_stats(filtered),
+        "get_top_transactions": lambda: get_top_transactions(filtered),
+        # Без декоратора save_report, чтобы не писать файл отчета в рабочий каталог.
+        # Первый замер с готовым индексом категорий, как в сервисе, второй строит индекс на каждом запуске
+        "spending_by_category": lambda: spending_by_category.__wrapped__(
+            frame, "Супермаркеты", end.strftime("%d.%m.%Y %H:%M:%S"), category_index
+        ),
+        "spending_by_category_cold": lambda: spending_by_category.__wrapped__(
+            frame, "Супермаркеты", end.strftime("%d.%m.%Y %H:%M:%S")
+        ),
+        "investment_bank": lambda: investment_bank(end.strftime("%Y-%m"), investment_frame, 50),
+        "generate_report": lambda: _report(frame, datetime_str),
+    })
+    return benchmarks
+
+
+def run(sizes: List[int], repeat: int, only: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """Замеры всех функций на всех размерах данных, ключ результата имя@строки"""
+    results: Dict[str, Dict[str, float]] = {}
+    with ExitStack() as stack, tempfile.TemporaryDirectory() as workdir:
+        for target, value in MARKET_STUBS.items():
+            stack.enter_context(patch(target, return_value=value))
+        for rows in sizes:
+            frame = make_operations(rows)
+            for name, func in make_benchmarks(frame, Path(workdir)).items():
+                if only and name not in only:
+                    continue
+                results[f"{name}@{rows}"] = measure(func, repeat)
+                print(f"{name:<22} {rows:>10} {results[f'{name}@{rows}']}", flush=True)
+            del frame
+    reload_transactions()
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]], tolerance: float
+) -> List[str]:
+    """Замеры, которые хуже базовых больше чем на tolerance"""
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if baseline[metric] and result[metric] > baseline[metric] * (1 + tolerance):
+                regressions.append(f"{key} {metric}: {baseline[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10k,1m", help="размеры данных через запятую, например 10k,1m,10m")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="", help="имена функций через запятую")
+    parser.add_argument("--save", action="store_true", help="сохранить результаты как базовые")
+    parser.add_argument("--compare", action="store_true", help="сравнить с базовыми результатами")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    sizes = [parse_rows(value) for value in args.rows.split(",")]
+    only = [name for name in args.only.split(",") if name] or None
+    results = run(sizes, args.repeat, only)
+
+    baselines = json.loads(BASELINES_PATH.read_text(encoding="utf-8")) if BASELINES_PATH.exists() else {}
+    if args.save:
+        BASELINES_PATH.write_text(
+            json.dumps({**baselines, **results}, ensure_ascii=False, indent=4, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"Базовые результаты сохранены в {BASELINES_PATH}")
+    if args.compare:
+        regressions = compare(results, baselines, args.tolerance)
+        for regression in regressions:
+            print(f"Регрессия: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Детерминированный генератор синтетических операций в формате operations.xlsx."""
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion import DATE_COLUMN, DATE_FORMAT, compact_transactions
+
+CATEGORY_NAMES = [
+    "Супермаркеты", "Фастфуд", "Транспорт", "Каршеринг", "Аптеки", "Рестораны", "Одежда и обувь", "Связь",
+    "Развлечения", "Дом и ремонт", "Топливо", "Переводы", "Красота", "Медицина", "Такси", "Книги", "Кино",
+    "Спорттовары", "Цветы", "Образование",
+]
+
+
+def _category_names(categories: int) -> List[str]:
+    """Названия категорий: сначала настоящие, затем пронумерованные"""
+    extra = [f"Категория {number}" for number in range(len(CATEGORY_NAMES), categories)]
+    return (CATEGORY_NAMES + extra)[:categories]
+
+
+def make_operations(
+    rows: int,
+    cards: int = 5,
+    categories: int = 20,
+    start: str = "2018-01-01",
+    days: int = 4 * 365,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Операции со схемой выгрузки, в том виде, в каком их возвращает read_operations
+
+    Строки отсортированы от новых к старым, как в выгрузке банка; текст хранится в category,
+    поэтому даже 10 млн строк помещаются в память.
+    """
+    rng = np.random.default_rng(seed)
+    start_date = pd.Timestamp(start)
+    seconds = np.sort(rng.integers(0, days * 24 * 3600, rows))[::-1]
+    dates = (start_date.to_datetime64() + seconds.astype("timedelta64[s]")).astype("datetime64[ns]")
+
+    day_codes = (seconds // (24 * 3600)).astype(np.int32)
+    payment_days = pd.date_range(start_date, periods=days, freq="D").strftime("%d.%m.%Y")
+
+    card_names = [f"*{1000 + 1117 * number % 9000}" for number in range(cards)]
+    card_codes = rng.integers(0, cards, rows)
+    card_codes[rng.random(rows) < 0.1] = -1
+
+    category_names = _category_names(categories)
+    category_codes = rng.integers(0, categories, rows)
+    descriptions = [f"{category} {number}" for category in category_names for number in range(10)]
+    description_codes = category_codes * 10 + rng.integers(0, 10, rows)
+
+    income = rng.random(rows) < 0.05
+    kopecks = np.rint(rng.lognormal(6.0, 1.2, rows) * 100)
+    amounts = np.where(income, kopecks, -kopecks) / 100
+    cashback = np.where(rng.random(rows) < 0.02, np.rint(np.abs(amounts)) / 100, np.nan)
+
+    df = pd.DataFrame({
+        DATE_COLUMN: dates,
+        "Дата платежа": pd.Categorical.from_codes(day_codes, payment_days),
+        "Номер карты": pd.Categorical.from_codes(card_codes, card_names),
+        "Статус": pd.Categorical.from_codes((rng.random(rows) < 0.01).astype(np.int8), ["OK", "FAILED"]),
+        "Сумма операции": amounts,
+        "Валюта операции": pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), ["RUB"]),
+        "Сумма платежа": amounts,
+        "Валюта платежа": pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), ["RUB"]),
+        "Кэшбэк": cashback,
+        "Категория": pd.Categorical.from_codes(category_codes, category_names),
+        "MCC": (5000 + category_codes).astype(np.float32),
+        "Описание": pd.Categorical.from_codes(description_codes, descriptions),
+        "Бонусы (включая кэшбэк)": (np.abs(amounts) // 100).astype(np.int64),
+        "Округление на инвесткопилку": np.zeros(rows, dtype=np.int64),
+        "Сумма операции с округлением": np.abs(amounts),
+    })
+    return compact_transactions(df)
+
+
+def to_export(df: pd.DataFrame) -> pd.DataFrame:
+    """Операции в виде исходной выгрузки: даты строками, текст обычными строками"""
+    export = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].dt.strftime(DATE_FORMAT)})
+    return export.astype({column: object for column in export.select_dtypes("category").columns})
+
+
+def write_xlsx(df: pd.DataFrame, file_path: Path) -> Path:
+    """Запись операций в эксель-файл в формате выгрузки"""
+    to_export(df).to_excel(file_path, index=False)
+    return Path(file_path)
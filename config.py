@@ -1 +1,30 @@
 path_xlsx = "data/operations.xlsx"
+path_accounts = "data/accounts"
+load_workers = 4
+market_workers = 4
+path_cache = "data/cache"
+
+currency_api_url = "https://api.apilayer.com/currency_data/live"
+currency_rates_ttl = 600
+path_rates_snapshot = "data/cache/currency_rates.json"
+request_timeout = 5
+request_retries = 3
+quote_workers = 8
+report_section_timeouts = {"currency_rates": 5.0, "stock_prices": 10.0}
+report_analytics_ttl = 3600
+report_market_ttl = 60
+report_disk_cache = False
+report_writer_queue_size = 16
+report_workers = 4
+rolling_window = "3M"
+server_host = "127.0.0.1"
+server_port = 8080
+server_workers = 4
+stream_batch_size = 50_000
+log_file = "logs/app.log"
+log_level = "INFO"
+log_levels = {"yfinance": "WARNING", "urllib3": "WARNING", "peewee": "WARNING"}
+log_sample_every = 100
+profiling_trace = None
+path_traces = "logs/traces.jsonl"
+path_profiles = "logs/profiles"
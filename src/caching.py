@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с временем жизни записей и счетчиком попаданий"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 600.0, timer: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._timer = timer
+        self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Значение по ключу, если оно есть и не устарело"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= self._timer():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохранение значения, самая старая запись вытесняется при переполнении"""
+        expires = self._timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очистка кэша и счетчиков"""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Число попаданий, промахов и записей в кэше"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import load_workers, path_accounts, path_cache, path_xlsx
+from src.money import round_rubles
+from src.profiling import instrumented, stage
+from src.writer import atomic_file, write_atomic
+
+logger = logging.getLogger(__name__)
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+DATE_COLUMN = "Дата операции"
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+# Версия формата кэша, увеличивается при изменении типов колонок
+CACHE_VERSION = 4
+
+AMOUNT_COLUMNS = ["Сумма операции", "Сумма платежа", "Кэшбэк", "Сумма операции с округлением"]
+
+# Колонки, по которым строка выгрузки узнается при повторной загрузке
+ROW_KEY_COLUMNS = [DATE_COLUMN, "Номер карты", "Сумма операции", "Описание"]
+
+STORE_NAME = "transactions"
+
+# Колонка с именем выгрузки при загрузке нескольких счетов
+SOURCE_COLUMN = "Источник"
+
+
+def file_fingerprint(file_path: Path) -> Dict[str, Any]:
+    """Быстрый отпечаток файла по размеру и времени изменения"""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def file_hash(file_path: Path) -> str:
+    """Хэш содержимого файла для проверки кэша после изменения mtime"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compact_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Компактные типы колонок: текст в category, целые и MCC в меньшую разрядность"""
+    for column in df.columns:
+        dtype = df[column].dtype
+        if dtype == object:
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    if "MCC" in df.columns:
+        df["MCC"] = df["MCC"].astype("float32")
+    return df
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, int]:
+    """Объем памяти в байтах по каждой колонке и всего"""
+    usage = df.memory_usage(deep=True)
+    report = {str(column): int(size) for column, size in usage.items()}
+    report["total"] = int(usage.sum())
+    return report
+
+
+@instrumented()
+def parse_operations(df: pd.DataFrame, compact: bool = True) -> pd.DataFrame:
+    """Приведение типов колонок выгрузки: дата операции в datetime64, компактный текст"""
+    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT)
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = round_rubles(df[column].to_numpy())
+    return compact_transactions(df) if compact else df
+
+
+def _cache_paths(file_path: Path, cache_dir: Path) -> tuple[Path, Path]:
+    """Пути к файлу данных и метаданных кэша для эксель-файла"""
+    return Path(cache_dir, f"{file_path.stem}.pkl"), Path(cache_dir, f"{file_path.stem}.json")
+
+
+def _read_meta(meta_path: Path) -> Dict[str, Any]:
+    """Чтение метаданных кэша, пустой словарь если их нет"""
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_meta(meta_path: Path, meta: Dict[str, Any]) -> None:
+    """Атомарная запись метаданных кэша"""
+    write_atomic(meta_path, json.dumps(meta))
+
+
+def read_operations(file_path: Optional[Path] = None, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    """Чтение операций из эксель-файла через колоночный кэш на диске"""
+    file_path = Path(ROOT_PATH, path_xlsx) if file_path is None else Path(file_path)
+    cache_dir = Path(ROOT_PATH, path_cache) if cache_dir is None else Path(cache_dir)
+    data_path, meta_path = _cache_paths(file_path, cache_dir)
+
+    fingerprint = file_fingerprint(file_path)
+    meta = _read_meta(meta_path)
+    if data_path.exists() and meta.get("version") == CACHE_VERSION:
+        if all(meta.get(key) == value for key, value in fingerprint.items()):
+            logger.info("Операции загружены из кэша")
+            return pd.read_pickle(data_path)
+        sha256 = file_hash(file_path)
+        if meta.get("sha256") == sha256:
+            _write_meta(meta_path, {**fingerprint, "sha256": sha256, "version": CACHE_VERSION})
+            logger.info("Операции загружены из кэша, обновлены метаданные")
+            return pd.read_pickle(data_path)
+    else:
+        sha256 = file_hash(file_path)
+
+    df = parse_operations(pd.read_excel(file_path))
+    with atomic_file(data_path) as file:
+        pickle.dump(df, file, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_meta(meta_path, {**fingerprint, "sha256": sha256, "version": CACHE_VERSION})
+    logger.info("Кэш операций пересобран из эксель-файла")
+
+    return df
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """Стабильный ключ строки: хэш ключевых колонок и номер повтора одинаковых строк"""
+    columns = {}
+    for column in ROW_KEY_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[column] = values.to_numpy().astype("int64")
+        elif pd.api.types.is_float_dtype(values):
+            columns[column] = values.to_numpy(dtype=np.float64)
+        else:
+            columns[column] = values.astype(str).to_numpy()
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+    # Одинаковые операции в одной выгрузке различаются порядковым номером
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(pd.DataFrame({"row": hashes, "occurrence": occurrence}), index=False).to_numpy()
+
+
+def concat_operations(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Склейка кусков операций с объединением категорий, чтобы колонки остались category"""
+    frames = [frame.copy(deep=False) for frame in frames]
+    for column in frames[0].columns:
+        columns = [frame[column] for frame in frames if column in frame.columns]
+        dtypes = [values.dtype for values in columns if isinstance(values.dtype, pd.CategoricalDtype)]
+        # Пустая колонка в отдельной выгрузке читается как float и не мешает объединению категорий
+        if dtypes and all(isinstance(values.dtype, pd.CategoricalDtype) or values.isna().all() for values in columns):
+            categories = pd.Index([]).append([dtype.categories for dtype in dtypes]).unique()
+            for frame in frames:
+                if column in frame.columns:
+                    frame[column] = pd.Categorical(frame[column], categories=categories)
+    return pd.concat(frames)
+
+
+def _store_paths(cache_dir: Path) -> Tuple[Path, Path]:
+    """Пути к накопленной таблице операций вместе с ключами строк и к ее метаданным"""
+    return Path(cache_dir, f"{STORE_NAME}.pkl"), Path(cache_dir, f"{STORE_NAME}.json")
+
+
+def _load_store(data_path: Path, meta: Dict[str, Any]) -> Optional[Tuple[pd.DataFrame, np.ndarray]]:
+    """Таблица и ключи строк из одного файла, None если файла нет или он другой версии"""
+    if meta.get("version") != CACHE_VERSION or not data_path.exists():
+        return None
+    with open(data_path, "rb") as file:
+        store = pickle.load(file)
+    return store["table"], store["keys"]
+
+
+@instrumented()
+def ingest_operations(
+    file_path: Optional[Path] = None, cache_dir: Optional[Path] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Дозагрузка выгрузки в накопленную таблицу операций: добавляются только новые строки"""
+    file_path = Path(ROOT_PATH, path_xlsx) if file_path is None else Path(file_path)
+    cache_dir = Path(ROOT_PATH, path_cache) if cache_dir is None else Path(cache_dir)
+    data_path, meta_path = _store_paths(cache_dir)
+
+    fingerprint = file_fingerprint(file_path)
+    meta = _read_meta(meta_path)
+    loaded = _load_store(data_path, meta)
+    sha256 = None
+    # Метаданные пишутся после таблицы: если число строк не сходится, запись прервалась
+    # и выгрузка сверяется с ключами таблицы заново
+    if loaded is not None and meta.get("rows") == len(loaded[0]):
+        stored = loaded[0]
+        if all(meta.get(key) == value for key, value in fingerprint.items()):
+            logger.info("Выгрузка уже загружена, новых операций нет")
+            return stored, stored.iloc[:0]
+        sha256 = file_hash(file_path)
+        if meta.get("sha256") == sha256:
+            _write_meta(meta_path, {**meta, **fingerprint})
+            logger.info("Выгрузка не изменилась, обновлены метаданные")
+            return stored, stored.iloc[:0]
+    sha256 = sha256 or file_hash(file_path)
+
+    with stage("ingestion.read_excel"):
+        excel = pd.read_excel(file_path)
+    operations = parse_operations(excel)
+    keys = row_keys(operations)
+    if loaded is None:
+        table, new_rows, table_keys = operations, operations, keys
+    else:
+        stored, stored_keys = loaded
+        is_new = ~np.isin(keys, stored_keys)
+        new_rows = operations[is_new]
+        table = concat_operations([stored, new_rows]).reset_index(drop=True) if len(new_rows) else stored
+        table_keys = np.concatenate([stored_keys, keys[is_new]])
+
+    # Таблица и ключи пишутся одним файлом, метаданные последними
+    if len(new_rows) or loaded is None:
+        with atomic_file(data_path) as file:
+            pickle.dump({"table": table, "keys": table_keys}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_meta(meta_path, {**fingerprint, "sha256": sha256, "rows": len(table), "version": CACHE_VERSION})
+    logger.info("Загружено новых операций: %d, всего %d", len(new_rows), len(table))
+
+    return table, new_rows
+
+
+def account_workbooks(dir_path: Optional[Path] = None) -> List[Path]:
+    """Эксель-файлы выгрузок по счетам в каталоге, пустой список если каталога нет"""
+    dir_path = Path(ROOT_PATH, path_accounts) if dir_path is None else Path(dir_path)
+    if not dir_path.is_dir():
+        return []
+    return sorted(path for path in dir_path.glob("*.xlsx") if not path.name.startswith("~$"))
+
+
+def _read_workbook(file_path: Path, cache_dir: Optional[Path]) -> pd.DataFrame:
+    """Загрузка одной выгрузки в процессе-обработчике"""
+    return read_operations(file_path, cache_dir)
+
+
+def read_accounts(
+    dir_path: Optional[Path] = None, cache_dir: Optional[Path] = None, workers: Optional[int] = None
+) -> pd.DataFrame:
+    """Параллельная загрузка выгрузок всех счетов в одну таблицу с колонкой источника"""
+    file_paths = account_workbooks(dir_path)
+    cache_dir = Path(ROOT_PATH, path_cache, "accounts") if cache_dir is None else Path(cache_dir)
+    if not file_paths:
+        raise FileNotFoundError(f"Нет выгрузок в каталоге {dir_path or path_accounts}")
+    workers = min(load_workers if workers is None else workers, len(file_paths))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_read_workbook, file_paths, [cache_dir] * len(file_paths)))
+    else:
+        frames = [_read_workbook(file_path, cache_dir) for file_path in file_paths]
+
+    for file_path, frame in zip(file_paths, frames):
+        frame[SOURCE_COLUMN] = pd.Categorical([file_path.stem] * len(frame))
+    df = concat_operations(frames).reset_index(drop=True)
+    logger.info("Загружено %d операций из %d выгрузок, обработчиков: %d", len(df), len(file_paths), workers)
+
+    return df
@@ -0,0 +1,98 @@
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Optional, Type
+
+from config import log_file, log_level, log_levels, log_sample_every
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(
+    file_path: Optional[Path] = None, level: Optional[str] = None, levels: Optional[Dict[str, str]] = None
+) -> QueueListener:
+    """Единая настройка логов: корневой логгер пишет в очередь, файл пишет фоновый поток"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        file_path = Path(ROOT_PATH, log_file) if file_path is None else Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(file_path, mode="a", encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(log_queue)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level or log_level)
+        for name, module_level in {**log_levels, **(levels or {})}.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Запись оставшихся в очереди сообщений и остановка фонового потока"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener, _queue_handler = None, None
+
+
+atexit.register(stop_logging)
+
+
+class SampledEvents:
+    """События по строкам или кускам: в лог идет каждое N-е, при выходе из блока один итог с их числом"""
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        name: str,
+        message: str,
+        every: int = log_sample_every,
+        level: int = logging.DEBUG,
+    ) -> None:
+        self.logger = logger
+        self.name = name
+        self.message = message
+        self.every = every
+        self.level = level
+        self.count = 0
+
+    def __call__(self, *args: Any) -> None:
+        """Учет события, сообщение форматируется только для попавших в выборку"""
+        self.count += 1
+        if (self.count - 1) % self.every == 0 and self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s #%d: " + self.message, self.name, self.count, *args)
+
+    def __enter__(self) -> "SampledEvents":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.logger.info("%s: всего %d", self.name, self.count)
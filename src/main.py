@@ -1,16 +1,19 @@
+from src.logger import setup_logging
 from src.reports import spending_by_category
 from src.services import investment_bank
-from src.utils import list_df, list_for_investment
+from src.utils import get_investment_frame, get_list_df
 from src.views import generate_report
 
+setup_logging()
+
 print("Это страница главная")
 print(generate_report("2021-12-31 15:30:00"))
 print()
 
 print("Это инвесткопилка")
-print(investment_bank("2021-10", list_for_investment, 100))
+print(investment_bank("2021-10", get_investment_frame(), 100))
 print()
 
 print("Это отчет по категориям")
-print(spending_by_category(list_df, "Супермаркеты", "31.12.2018 16:39:04"))
+print(spending_by_category(get_list_df(), "Супермаркеты", "31.12.2018 16:39:04"))
 # print(spending_by_category(list_df, "Супермаркеты"))
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from config import (currency_api_url, currency_rates_ttl, path_rates_snapshot, quote_workers, request_retries,
+                    request_timeout)
+from src.caching import TTLCache
+from src.writer import write_atomic
+
+logger = logging.getLogger(__name__)
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+rates_cache = TTLCache(maxsize=32, ttl=currency_rates_ttl)
+
+_session: Optional[Any] = None
+_session_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+
+
+def get_session() -> Any:
+    """Общая HTTP-сессия с пулом соединений и повторами запросов"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=request_retries,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(max_retries=retry))
+            session.mount("http://", HTTPAdapter(max_retries=retry))
+            _session = session
+        return _session
+
+
+def load_rates_snapshot(snapshot_path: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """Последние полученные котировки валют, сохраненные на диске"""
+    snapshot_path = Path(ROOT_PATH, path_rates_snapshot) if snapshot_path is None else snapshot_path
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_rates_snapshot(symbols: str, quotes: Dict[str, float], snapshot_path: Optional[Path] = None) -> None:
+    """Сохранение котировок валют на диск на случай недоступности сети"""
+    snapshot_path = Path(ROOT_PATH, path_rates_snapshot) if snapshot_path is None else snapshot_path
+    with _snapshot_lock:
+        snapshot = load_rates_snapshot(snapshot_path)
+        snapshot[symbols] = quotes
+        write_atomic(snapshot_path, json.dumps(snapshot))
+
+
+def missing_quotes(currencies: List[str], quotes: Dict[str, float]) -> List[str]:
+    """Запрошенные валюты, курса которых к доллару нет в ответе АПИ"""
+    return [currency for currency in currencies if currency != "USD" and f"USD{currency}" not in quotes]
+
+
+def fetch_currency_quotes(currencies: List[str], url: Optional[str] = None) -> Dict[str, float]:
+    """Котировки валют к доллару: из кэша, по АПИ или из снимка на диске"""
+    import requests
+
+    symbols = ",".join(currencies)
+    cached = rates_cache.get(symbols)
+    if cached is not None:
+        return cached
+
+    try:
+        response = get_session().get(
+            currency_api_url if url is None else url,
+            params={"symbols": symbols},
+            headers={"apikey": os.getenv("API_KEY")},
+            timeout=request_timeout,
+        )
+        response.raise_for_status()
+        quotes = response.json().get("quotes") or {}
+        logger.info("Курсы валют получены по АПИ")
+    except requests.RequestException:
+        logger.error("Ошибка соединения с сервером, используется сохраненный снимок курсов")
+        quotes = load_rates_snapshot().get(symbols)
+        if quotes is None:
+            raise
+        rates_cache.set(symbols, quotes)
+        return quotes
+
+    # Неполный ответ не кэшируется и не затирает последний полный снимок
+    missing = missing_quotes(currencies, quotes)
+    if not quotes or missing:
+        logger.warning("АПИ не вернул курсы %s, используется сохраненный снимок курсов", missing or currencies)
+        return load_rates_snapshot().get(symbols, quotes)
+
+    save_rates_snapshot(symbols, quotes)
+    rates_cache.set(symbols, quotes)
+    return quotes
+
+
+class QuoteProvider(ABC):
+    """Источник цен закрытия акций"""
+
+    max_workers = quote_workers
+
+    @abstractmethod
+    def get_close_price(self, symbol: str) -> float:
+        """Цена закрытия одной бумаги за последний доступный день"""
+
+    def get_close_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Цены закрытия нескольких бумаг, запросы идут параллельно"""
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as pool:
+            return dict(zip(symbols, pool.map(self.get_close_price, symbols)))
+
+
+class YFinanceTickerProvider(QuoteProvider):
+    """Цены закрытия из yfinance, отдельный запрос на каждую бумагу"""
+
+    def get_close_price(self, symbol: str) -> float:
+        import yfinance as yf
+
+        data = yf.Ticker(symbol).history(period="1d")
+        return float(data["Close"].iloc[-1])
+
+
+class YFinanceBatchProvider(YFinanceTickerProvider):
+    """Цены закрытия из yfinance одной пакетной загрузкой"""
+
+    def get_close_prices(self, symbols: List[str]) -> Dict[str, float]:
+        import yfinance as yf
+
+        if not symbols:
+            return {}
+        data = yf.download(symbols, period="1d", group_by="column", progress=False)
+        closes = data["Close"] if not data.empty else pd.DataFrame()
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+        last = closes.ffill().iloc[-1] if len(closes) else pd.Series(dtype=float)
+
+        prices = {symbol: float(last[symbol]) for symbol in symbols if pd.notna(last.get(symbol))}
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            logger.error("Пакетная загрузка не вернула цены для %s, запрос по одной бумаге", missing)
+            prices.update(super().get_close_prices(missing))
+        return prices
+
+
+default_quote_provider: QuoteProvider = YFinanceBatchProvider()
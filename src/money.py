@@ -0,0 +1,39 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+import numpy as np
+
+# Денежные суммы внутри расчетов хранятся в целых копейках (int64), в рубли переводятся только на выходе
+KOPECKS_IN_RUBLE = 100
+
+
+def to_kopecks(amounts: Any) -> np.ndarray:
+    """Перевод сумм в рублях в целые копейки, пропущенные суммы считаются нулем"""
+    kopecks = np.rint(np.asarray(amounts, dtype=np.float64) * KOPECKS_IN_RUBLE)
+    return np.nan_to_num(kopecks, nan=0.0).astype(np.int64)
+
+
+def rubles_to_kopecks(amount: float) -> int:
+    """Перевод одной суммы в рублях в целые копейки"""
+    return int(round(amount * KOPECKS_IN_RUBLE))
+
+
+def round_rubles(amounts: Any) -> np.ndarray:
+    """Суммы в рублях, точно соответствующие целому числу копеек, пропуски сохраняются"""
+    return np.rint(np.asarray(amounts, dtype=np.float64) * KOPECKS_IN_RUBLE) / KOPECKS_IN_RUBLE
+
+
+def kopecks_to_rubles(total: int) -> float:
+    """Перевод суммы в копейках в рубли с округлением до копейки"""
+    return float((Decimal(int(total)) / KOPECKS_IN_RUBLE).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+def rounding_kopecks(amounts: np.ndarray, rounding_step: int) -> np.ndarray:
+    """Векторный расчет округления на инвесткопилку в копейках"""
+    step = rounding_step * KOPECKS_IN_RUBLE
+    return (amounts + step - KOPECKS_IN_RUBLE) // step * step - amounts
+
+
+def cashback_kopecks(totals: np.ndarray) -> np.ndarray:
+    """Кэшбек 1 рубль на каждые 100 рублей, половина копейки округляется вверх"""
+    return (np.abs(totals) + 50) // 100
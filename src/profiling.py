@@ -0,0 +1,158 @@
+import cProfile
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from config import path_profiles, path_traces
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+class Trace:
+    """Этапы одного запроса: время, процессорное время, строки и выделенная память"""
+
+    def __init__(self) -> None:
+        self.stages: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.peak_kb: Optional[float] = None
+        self.profile_path: Optional[str] = None
+
+    def finish(self) -> None:
+        """Итоговое время запроса"""
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+        self.cpu_ms = (time.process_time() - self.cpu_started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Трасса в виде словаря для отчета или файла метрик"""
+        trace = {"wall_ms": round(self.wall_ms, 3), "cpu_ms": round(self.cpu_ms, 3), "stages": self.stages}
+        if self.peak_kb is not None:
+            trace["peak_kb"] = self.peak_kb
+        if self.profile_path is not None:
+            trace["profile"] = self.profile_path
+        return trace
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+# Вложенность текущего этапа, одна переменная на модуль, trace_request обнуляет ее для каждого запроса
+_stage_depth: ContextVar[int] = ContextVar("stage_depth", default=0)
+
+
+def current_trace() -> Optional[Trace]:
+    """Трасса текущего запроса или None, если запрос не трассируется"""
+    return _current_trace.get()
+
+
+def _row_count(value: Any) -> Optional[int]:
+    """Число строк датафрейма или списка, для остальных значений None"""
+    if isinstance(value, (pd.DataFrame, pd.Series, list)):
+        return len(value)
+    return None
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """Замер этапа внутри трассируемого запроса, без трассы ничего не делает"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    record: Dict[str, Any] = {"name": name, "depth": _stage_depth.get(), "thread": threading.current_thread().name}
+    if rows is not None:
+        record["rows"] = rows
+    memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    token = _stage_depth.set(record["depth"] + 1)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    finally:
+        record["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        record["cpu_ms"] = round((time.thread_time() - cpu_started) * 1000, 3)
+        if memory is not None and tracemalloc.is_tracing():
+            record["alloc_kb"] = round((tracemalloc.get_traced_memory()[0] - memory) / 1024, 1)
+        _stage_depth.reset(token)
+        trace.stages.append(record)
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    """Декоратор этапа: время, строки на входе и выходе функции в трассе запроса"""
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with stage(stage_name, _row_count(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                rows_out = _row_count(result)
+                # Трасса проверена выше, поэтому stage возвращает запись этапа
+                if record is not None and rows_out is not None:
+                    record["rows_out"] = rows_out
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def trace_request(profile: Optional[str] = None, profile_dir: Optional[Path] = None) -> Iterator[Trace]:
+    """Трассировка одного запроса, по желанию со снимком cProfile или tracemalloc в файл"""
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"Неизвестный профилировщик {profile}, доступны {PROFILERS}")
+    trace = Trace()
+    token = _current_trace.set(trace)
+    depth_token = _stage_depth.set(0)
+    profiler = cProfile.Profile() if profile == "cprofile" else None
+    started_tracemalloc = profile == "tracemalloc" and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield trace
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        trace.finish()
+        _stage_depth.reset(depth_token)
+        _current_trace.reset(token)
+        if profile is not None:
+            profile_dir = Path(ROOT_PATH, path_profiles) if profile_dir is None else Path(profile_dir)
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            if profiler is not None:
+                profile_path = profile_dir / f"request_{stamp}.prof"
+                profiler.dump_stats(profile_path)
+            else:
+                trace.peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                profile_path = profile_dir / f"request_{stamp}.tracemalloc"
+                tracemalloc.take_snapshot().dump(str(profile_path))
+                if started_tracemalloc:
+                    tracemalloc.stop()
+            trace.profile_path = str(profile_path)
+
+
+def write_trace(trace: Trace, label: str, file_path: Optional[Path] = None) -> None:
+    """Дописывание трассы запроса строкой JSON в файл метрик"""
+    file_path = Path(ROOT_PATH, path_traces) if file_path is None else Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps({"request": label, **trace.to_dict()}, ensure_ascii=False)
+    with open(file_path, "a", encoding="utf-8") as file:
+        file.write(line + "\n")
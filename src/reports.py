@@ -1,36 +1,41 @@
+import functools
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterable, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from src.utils import list_df
+from config import rolling_window
+from src.ingestion import DATE_COLUMN
+from src.money import KOPECKS_IN_RUBLE
+from src.profiling import instrumented
+from src.serialization import FRAME_JSON_OPTIONS, dumps
+from src.store import (CardIndex, CategoryIndex, build_card_index, build_category_index, build_time_index,
+                       card_rolling_totals, categories_window, category_rolling_totals, parse_dates, window_offset)
+from src.writer import get_report_writer, write_atomic
 
 ROOT_PATH = Path(__file__).resolve().parent.parent
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler(
-            Path(ROOT_PATH, "logs/repots.log"), mode="w", encoding="utf-8"
-        ),
-    ],
-)
+logger = logging.getLogger(__name__)
 
 
-def save_report(file_name: Optional[str] = None) -> Callable:
+def save_report(
+    file_name: Optional[str] = None, background: bool = False, compress: bool = False
+) -> Callable:
     def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             result = func(*args, **kwargs)
             if file_name:
                 output_file = file_name
             else:
                 output_file = "default_report.json"
-            with open(output_file, "w", encoding="utf-8") as file:
-                file.write(result)
+            if background:
+                get_report_writer().submit(output_file, result, compress)
+            else:
+                write_atomic(output_file, result, compress)
             return result
 
         return wrapper
@@ -38,42 +43,144 @@ def save_report(file_name: Optional[str] = None) -> Callable:
     return decorator
 
 
+def _window_end(category_index: CategoryIndex, date: Optional[str]) -> datetime:
+    """Конец трехмесячного окна: указанная дата или дата последней операции"""
+    if date is None:
+        logger.info("Фильтрация по категориям по последней дате")
+        return pd.Timestamp(category_index["dates"].max())
+    logger.info("Фильтрация по категориям по указанной дате")
+    return datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+
+
+def category_window(
+    transactions: pd.DataFrame,
+    category: str,
+    date: Optional[str] = None,
+    category_index: Optional[CategoryIndex] = None,
+) -> pd.DataFrame:
+    """Операции категории за три месяца до указанной или последней даты
+
+    Индекс категорий строится по transactions, если не передан уже построенный для этого датафрейма.
+    """
+    if category_index is None:
+        category_index = build_category_index(transactions)
+    end_date = _window_end(category_index, date)
+    three_months_ago = end_date - pd.DateOffset(months=3)
+
+    return categories_window(transactions, [category], three_months_ago, end_date, category_index)[category]
+
+
 @save_report("custom_report.json")
 # @save_report()
+@instrumented()
 def spending_by_category(
-    transactions: pd.DataFrame, category: str, date: Optional[str] = None
+    transactions: pd.DataFrame,
+    category: str,
+    date: Optional[str] = None,
+    category_index: Optional[CategoryIndex] = None,
 ) -> pd.DataFrame:
     """Сортировка списка словарей по дате и категориям"""
-    transactions["Дата операции"] = pd.to_datetime(
-        transactions["Дата операции"], format="%d.%m.%Y %H:%M:%S"
-    )
+    filtered = category_window(transactions, category, date, category_index)
+    json_data = filtered.to_json(**FRAME_JSON_OPTIONS)
 
-    if date is None:
-        last_date = transactions["Дата операции"].max()
-        three_months_ago = last_date - pd.DateOffset(months=3)
-
-        filtered_df = transactions[
-            (transactions["Дата операции"] >= three_months_ago)
-            & (transactions["Дата операции"] <= last_date)
-        ]
-        filtered = filtered_df[filtered_df["Категория"] == category]
-        logging.info("Фильтрация по категориям по последней дате")
-    else:
-        user_date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
-        three_months_ago = user_date - pd.DateOffset(months=3)
+    return json_data
 
-        filtered_df = transactions[
-            (transactions["Дата операции"] >= three_months_ago)
-            & (transactions["Дата операции"] <= user_date)
-        ]
-        filtered = filtered_df[filtered_df["Категория"] == category]
-        logging.info("Фильтрация по категориям по указанной дате")
-    json_data = filtered.to_json(orient="records", force_ascii=False)
 
-    return json_data
+def spending_by_categories(
+    transactions: pd.DataFrame,
+    categories: List[str],
+    date: Optional[str] = None,
+    category_index: Optional[CategoryIndex] = None,
+) -> str:
+    """Траты по нескольким категориям за три месяца одним запросом к индексу"""
+    if category_index is None:
+        category_index = build_category_index(transactions)
+    end_date = _window_end(category_index, date)
+    three_months_ago = end_date - pd.DateOffset(months=3)
+
+    windows = categories_window(transactions, categories, three_months_ago, end_date, category_index)
+
+    return dumps(windows).decode("utf-8")
+
+
+@save_report("custom_report.json")
+def spending_by_category_batches(
+    batches: Iterable[pd.DataFrame], category: str, date: Optional[str] = None
+) -> str:
+    """Траты по категории за три месяца по потоку кусков, в памяти только строки окна"""
+    end_date = None if date is None else datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+    last_date = None
+    kept: List[pd.DataFrame] = []
+    for batch in batches:
+        dates = parse_dates(batch["Дата операции"])
+        if end_date is None and len(dates):
+            last_date = dates.max() if last_date is None else max(last_date, dates.max())
+        window_end = end_date if end_date is not None else last_date
+        if window_end is None:
+            continue
+        three_months_ago = window_end - pd.DateOffset(months=3)
+
+        # Уже отобранные строки отсекаются по мере сдвига конца окна
+        kept = [rows[rows["Дата операции"] >= three_months_ago] for rows in kept]
+        in_window = (batch["Категория"] == category) & (dates >= three_months_ago) & (dates <= window_end)
+        kept.append(batch[in_window].assign(**{"Дата операции": dates[in_window]}))
+
+    filtered = pd.concat(kept) if kept else pd.DataFrame()
+    logger.info("Фильтрация по категориям по потоку операций")
+
+    return filtered.to_json(**FRAME_JSON_OPTIONS)
+
+
+@instrumented()
+def rolling_spending(
+    transactions: pd.DataFrame,
+    window: Union[str, pd.DateOffset, pd.Timedelta] = rolling_window,
+    by: str = "category",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    card_index: Optional[CardIndex] = None,
+    category_index: Optional[CategoryIndex] = None,
+) -> pd.DataFrame:
+    """Траты за скользящее окно на конец каждого дня: строки — дни, колонки — категории или карты
+
+    Окно задается записью вида 3M, 90D, 2W или 1Y. Значение на день совпадает с суммой
+    spending_by_category на дату "ДД.ММ.ГГГГ 23:59:59", но весь ряд считается по накопленным
+    суммам за один проход. start и end в формате ДД.ММ.ГГГГ, по умолчанию первый и последний день операций.
+    """
+    offset = window_offset(window)
+    if by == "category":
+        if category_index is None:
+            category_index = build_category_index(transactions)
+        dates = category_index["dates"]
+    elif by == "card":
+        dates = parse_dates(transactions[DATE_COLUMN]).to_numpy()
+        if card_index is None:
+            card_index = build_card_index(build_time_index(transactions))
+    else:
+        raise ValueError(f"Неизвестная группировка {by!r}, доступны category и card")
+
+    dates = dates[~np.isnat(dates)]
+    if start is None and end is None and not len(dates):
+        return pd.DataFrame(index=pd.DatetimeIndex([], name=DATE_COLUMN))
+    first = datetime.strptime(start, "%d.%m.%Y") if start is not None else pd.Timestamp(dates.min())
+    last = datetime.strptime(end, "%d.%m.%Y") if end is not None else pd.Timestamp(dates.max())
+    days = pd.date_range(pd.Timestamp(first).normalize(), pd.Timestamp(last).normalize(), freq="D", name=DATE_COLUMN)
+    ends = days + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    starts = (ends - offset).to_numpy()
+
+    if by == "category":
+        totals = category_rolling_totals(transactions, starts, ends.to_numpy(), category_index)
+    else:
+        assert card_index is not None
+        totals = card_rolling_totals(card_index, starts, ends.to_numpy())
+    logger.info("Скользящие траты за окно %s по %d группам на %d дней", window, len(totals), len(days))
+
+    return pd.DataFrame({name: total / KOPECKS_IN_RUBLE for name, total in totals.items()}, index=days)
 
 
 if __name__ == "__main__":
+    from src.utils import list_df
+
     print(list_df)
     # print(spending_by_category(list_df, "Супермаркеты", "31.12.2018 16:39:04"))
     # print(spending_by_category(list_df, "Супермаркеты"))
@@ -0,0 +1,87 @@
+import json
+import math
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Параметры to_json, с которыми отчеты по категориям отдавались и раньше
+FRAME_JSON_OPTIONS: Dict[str, Any] = {"orient": "records", "force_ascii": False}
+
+# Датафрейм внутри словаря кодируется как строка-метка, на ее место затем вставляется вывод to_json
+_FRAME_MARK = "\x00frame:{}\x00"
+_FRAME_MARK_PATTERN = re.compile(rb'"\\u0000frame:(\d+)\\u0000"')
+
+
+def _finite(value: Any) -> Any:
+    """NaN и бесконечности как None, остальные значения без изменений"""
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def _default(value: Any) -> Any:
+    """Значения, которые json не умеет кодировать сам: даты, numpy-скаляры, массивы, пропуски"""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+        return None if value is pd.NaT else value.strftime(DATETIME_FORMAT)
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return _finite(value.item())
+    if isinstance(value, (np.ndarray, pd.Series)):
+        if value.dtype.kind == "f":
+            values = np.asarray(value)
+            finite = values.astype(object)
+            finite[~np.isfinite(values)] = None
+            return finite.tolist()
+        if value.dtype.kind == "M":
+            return [_default(item) for item in np.asarray(value)]
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def frame_json(frame: pd.DataFrame, pretty: bool = False) -> bytes:
+    """Строки датафрейма в JSON-байты напрямую через to_json, без промежуточных словарей"""
+    return frame.to_json(**FRAME_JSON_OPTIONS, indent=4 if pretty else 0).encode("utf-8")
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Отчет в JSON-байты UTF-8: компактно или с отступами как json.dumps(indent=4)
+
+    Даты записываются строками, NaN в массивах и сериях numpy — как null. Числа float
+    (в том числе np.float64) кодируются json как есть, пропуски в них заменяются на None
+    там, где строятся данные.
+    Датафреймы внутри структуры кодируются через to_json и вставляются в результат без перевода в словари.
+    """
+    frames: List[pd.DataFrame] = []
+
+    def default(value: Any) -> Any:
+        if isinstance(value, pd.DataFrame):
+            frames.append(value)
+            return _FRAME_MARK.format(len(frames) - 1)
+        return _default(value)
+
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=4, default=default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
+    payload = text.encode("utf-8")
+    if not frames:
+        return payload
+
+    def insert_frame(match: re.Match) -> bytes:
+        encoded = frame_json(frames[int(match.group(1))], pretty)
+        if pretty:
+            line_start = payload.rfind(b"\n", 0, match.start()) + 1
+            margin = len(payload[line_start:match.start()]) - len(payload[line_start:match.start()].lstrip(b" "))
+            encoded = encoded.replace(b"\n", b"\n" + b" " * margin)
+        return encoded
+
+    return _FRAME_MARK_PATTERN.sub(insert_frame, payload)
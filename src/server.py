@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import time
+from bisect import bisect_left
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from config import server_host, server_port, server_workers
+from src.logger import setup_logging
+from src.reports import category_window
+from src.serialization import dumps, frame_json
+from src.services import investment_savings
+from src.utils import (get_card_index, get_category_data, get_investment_frame, get_list_df,
+                       get_transaction_index)
+from src.views import build_report
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы задержек в миллисекундах
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class LatencyHistogram:
+    """Гистограмма задержек запросов с фиксированными корзинами"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        """Учет одного запроса"""
+        self.counts[bisect_left(self.buckets, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля по верхней границе корзины, None если запросов не было"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return float(bound)
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние гистограммы для ответа /metrics"""
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _required(params: Dict[str, str], name: str) -> str:
+    """Обязательный параметр запроса"""
+    if not params.get(name):
+        raise ValueError(f"Не задан параметр {name}")
+    return params[name]
+
+
+def _checked_date(params: Dict[str, str], name: str, date_format: str, example: str) -> Optional[str]:
+    """Параметр с датой, если он передан, проверяется по формату"""
+    value = params.get(name)
+    if value is not None:
+        try:
+            datetime.strptime(value, date_format)
+        except ValueError:
+            raise ValueError(f"Параметр {name} должен иметь вид {example}, получено {value!r}") from None
+    return value
+
+
+def _report_params(params: Dict[str, str]) -> Dict[str, Any]:
+    """Параметры главной страницы"""
+    _required(params, "datetime")
+    return {"datetime": _checked_date(params, "datetime", "%Y-%m-%d %H:%M:%S", "2021-12-31 15:30:00")}
+
+
+def _investment_params(params: Dict[str, str]) -> Dict[str, Any]:
+    """Параметры инвесткопилки: месяц и положительный порог округления"""
+    _required(params, "month")
+    limit = params.get("limit", "50")
+    if not limit.isdigit() or int(limit) <= 0:
+        raise ValueError(f"Параметр limit должен быть положительным целым числом, получено {limit!r}")
+    return {"month": _checked_date(params, "month", "%Y-%m", "2021-10"), "limit": int(limit)}
+
+
+def _category_params(params: Dict[str, str]) -> Dict[str, Any]:
+    """Параметры трат по категории: категория и необязательная дата"""
+    return {
+        "category": _required(params, "category"),
+        "date": _checked_date(params, "date", "%d.%m.%Y %H:%M:%S", "31.12.2018 16:39:04"),
+    }
+
+
+def _report(params: Dict[str, Any]) -> bytes:
+    """Главная страница на дату"""
+    return dumps(build_report(params["datetime"]))
+
+
+def _investment(params: Dict[str, Any]) -> bytes:
+    """Инвесткопилка за месяц"""
+    return dumps(investment_savings(params["month"], get_investment_frame(), params["limit"]))
+
+
+def _category(params: Dict[str, Any]) -> bytes:
+    """Траты по категории за три месяца, без записи файла отчета на каждый запрос"""
+    transactions, category_index = get_category_data()
+    return frame_json(category_window(transactions, params["category"], params["date"], category_index))
+
+
+# Маршрут: проверка параметров в цикле событий и расчет в пуле обработчиков
+ROUTES: Dict[str, Tuple[Callable[[Dict[str, str]], Dict[str, Any]], Callable[[Dict[str, Any]], bytes]]] = {
+    "/report": (_report_params, _report),
+    "/investment": (_investment_params, _investment),
+    "/category": (_category_params, _category),
+}
+
+
+class ReportServer:
+    """HTTP/JSON сервис отчетов: данные и кэши живут в процессе между запросами"""
+
+    def __init__(self, workers: int = server_workers) -> None:
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="server")
+        self.histograms: Dict[str, LatencyHistogram] = {path: LatencyHistogram() for path in ROUTES}
+        self.started = time.monotonic()
+
+    def warm_up(self) -> None:
+        """Загрузка операций и индексов до первого запроса"""
+        get_list_df()
+        get_transaction_index()
+        get_card_index()
+        get_category_data()
+        logger.info("Данные сервиса загружены")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Гистограммы задержек по каждому маршруту"""
+        return {
+            "uptime_s": round(time.monotonic() - self.started, 3),
+            "latency": {path: histogram.snapshot() for path, histogram in self.histograms.items()},
+        }
+
+    async def dispatch(self, method: str, target: str) -> Tuple[int, Union[str, bytes]]:
+        """Выполнение запроса: расчеты уходят в пул, цикл событий остается свободным"""
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, json.dumps({"status": "ok"})
+        if url.path == "/metrics":
+            return 200, json.dumps(self.metrics(), ensure_ascii=False)
+        route = ROUTES.get(url.path)
+        if route is None:
+            return 404, json.dumps({"error": f"Неизвестный путь {url.path}"}, ensure_ascii=False)
+        if method != "GET":
+            return 405, json.dumps({"error": f"Метод {method} не поддерживается"}, ensure_ascii=False)
+
+        parse_params, handler = route
+        body: Union[str, bytes]
+        started = time.perf_counter()
+        try:
+            params = parse_params(dict(parse_qsl(url.query)))
+        except ValueError as error:
+            status, body = 400, json.dumps({"error": f"Неверные параметры: {error}"}, ensure_ascii=False)
+        else:
+            # Ошибки расчетов, в том числе ValueError и KeyError, не связаны с запросом и отдаются как 500
+            try:
+                body = await asyncio.get_running_loop().run_in_executor(self.pool, handler, params)
+                status = 200
+            except Exception as error:
+                logger.error("Ошибка обработки %s: %r", target, error)
+                status, body = 500, json.dumps({"error": "Внутренняя ошибка"}, ensure_ascii=False)
+        self.histograms[url.path].observe((time.perf_counter() - started) * 1000)
+
+        return status, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка соединения, keep-alive по умолчанию для HTTP/1.1"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers: Dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, body = await self.dispatch(method, target)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = server_host, port: int = server_port) -> asyncio.Server:
+        """Запуск сервиса после прогрева данных"""
+        await asyncio.get_running_loop().run_in_executor(self.pool, self.warm_up)
+        server = await asyncio.start_server(self.handle, host, port)
+        addresses = [sock.getsockname() for sock in server.sockets]
+        logger.info("Сервис отчетов слушает %s", addresses)
+        return server
+
+    def close(self) -> None:
+        """Остановка пула обработчиков"""
+        self.pool.shutdown(wait=True)
+
+
+def _response(status: int, body: Union[str, bytes], keep_alive: bool) -> bytes:
+    """HTTP-ответ с JSON-телом, маршруты отдают уже закодированные байты"""
+    payload = body if isinstance(body, bytes) else body.encode("utf-8")
+    headers: List[str] = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(payload)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + payload
+
+
+async def serve(host: str = server_host, port: int = server_port) -> None:
+    """Работа сервиса до остановки процесса"""
+    setup_logging()
+    report_server = ReportServer()
+    server = await report_server.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        report_server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -22,37 +22,30 @@
 # if __name__ == "__main__":
 #     print(investment_bank("2021-10", list_for_investment, 100))
 
-import json
 import logging
 from datetime import datetime
-from decimal import ROUND_HALF_UP, Decimal
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.money import KOPECKS_IN_RUBLE, kopecks_to_rubles, rounding_kopecks, rubles_to_kopecks, to_kopecks
+from src.profiling import instrumented
+from src.serialization import dumps
 
 ROOT_PATH = Path(__file__).resolve().parent.parent
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler(
-            Path(ROOT_PATH, "logs/services.log"), mode="w", encoding="utf-8"
-        ),
-    ],
-)
+logger = logging.getLogger(__name__)
+
+# Ключ матрицы по картам для операций без номера карты
+NO_CARD = "Без карты"
 
 
 def calculate_rounding_amount(amount: float, rounding_step: int) -> float:
     """Функция рассчитывает сумму на инвесткопилку в зависимости от шага"""
-    """Здесь я пытался избавится от таких значений в выводе: '234.424949294', но не получилось"""
-    # amount_decimal = Decimal(str(amount))
-    # rounding_step_decimal = Decimal(rounding_step)
-    # rounded_amount = (amount_decimal // rounding_step_decimal + 1) * rounding_step_decimal
-    # rounding_amount = rounded_amount - amount_decimal
-    # logging.info(f"Original amount: {amount}, Rounded amount: {rounded_amount}, Rounding amount: {rounding_amount}")
-    # return float(rounding_amount)
-    return ((amount + rounding_step - 1) // rounding_step) * rounding_step - amount
+    kopecks = np.array([rubles_to_kopecks(amount)], dtype=np.int64)
+    return int(rounding_kopecks(kopecks, rounding_step)[0]) / KOPECKS_IN_RUBLE
 
 
 def parse_date(date_str: str) -> datetime:
@@ -66,28 +59,94 @@ def parse_date(date_str: str) -> datetime:
     raise ValueError(f"Date {date_str} does not match any of the expected formats")
 
 
+def operation_months(dates: pd.Series) -> np.ndarray:
+    """Месяц каждой операции как datetime64[M]"""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format="ISO8601")
+    return dates.to_numpy().astype("datetime64[M]")
+
+
+@instrumented()
+def investment_savings(
+    month: str, all_transactions: Union[List[Dict[str, Any]], pd.DataFrame], limit: int
+) -> Dict[str, Any]:
+    """Сумма, которую удалось бы отложить в «Инвесткопилку», в виде словаря ответа"""
+    if isinstance(all_transactions, pd.DataFrame):
+        frame = all_transactions
+    else:
+        frame = pd.DataFrame(all_transactions, columns=["Дата операции", "Сумма операции"])
+
+    total_sum = 0
+    if len(frame):
+        in_month = operation_months(frame["Дата операции"]) == np.datetime64(month, "M")
+        amounts = to_kopecks(frame["Сумма операции"].to_numpy()[in_month])
+        total_sum = int(rounding_kopecks(amounts, limit).sum())
+
+    result = kopecks_to_rubles(total_sum)
+    logger.info("Total Sum for Investment Bank: %s", result)
+
+    return {"month": month, "total_savings": result}
+
+
 def investment_bank(
-    month: str, all_transactions: List[Dict[str, Any]], limit: int
+    month: str, all_transactions: Union[List[Dict[str, Any]], pd.DataFrame], limit: int
 ) -> str:
     """Функция расчитывает сумму, которую удалось бы отложить в «Инвесткопилку»."""
-    total_sum = Decimal("0.00")
-    for transaction in all_transactions:
-        transaction_date = parse_date(transaction["Дата операции"])
-        if transaction_date.strftime("%Y-%m") == month:
-            rounding_amount = calculate_rounding_amount(
-                transaction["Сумма операции"], limit
-            )
-            total_sum += Decimal(str(rounding_amount))
-            logging.info(
-                f"Transaction Date: {transaction_date},"
-                f" Amount: {transaction['Сумма операции']}, Rounding Amount: {rounding_amount}"
-            )
-
-    result = total_sum.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    logging.info(f"Total Sum for Investment Bank: {result}")
-
-    response = {"month": month, "total_savings": float(result)}
-    return json.dumps(response, ensure_ascii=False, indent=4)
+    return dumps(investment_savings(month, all_transactions, limit), pretty=True).decode("utf-8")
+
+
+def investment_bank_batches(month: str, batches: Iterable[pd.DataFrame], limit: int) -> str:
+    """Инвесткопилка по потоку кусков операций, в памяти только один кусок"""
+    month64 = np.datetime64(month, "M")
+    total_sum = 0
+    for batch in batches:
+        in_month = operation_months(batch["Дата операции"]) == month64
+        amounts = np.abs(to_kopecks(batch["Сумма операции"].to_numpy()[in_month]))
+        total_sum += int(rounding_kopecks(amounts, limit).sum())
+
+    result = kopecks_to_rubles(total_sum)
+    logger.info("Total Sum for Investment Bank: %s", result)
+
+    response = {"month": month, "total_savings": result}
+    return dumps(response, pretty=True).decode("utf-8")
+
+
+@instrumented()
+def investment_bank_matrix(
+    all_transactions: Union[List[Dict[str, Any]], pd.DataFrame],
+    months: Optional[Iterable[str]] = None,
+    limits: Iterable[int] = (10, 50, 100),
+    by_card: bool = False,
+) -> str:
+    """Инвесткопилка сразу для набора месяцев и порогов округления за один проход"""
+    frame = all_transactions if isinstance(all_transactions, pd.DataFrame) else pd.DataFrame(all_transactions)
+    limits = list(limits)
+    keys = ["month", "card"] if by_card else ["month"]
+
+    savings = pd.DataFrame({"month": operation_months(frame["Дата операции"]).astype(str)})
+    if by_card:
+        cards = frame["Номер карты"].astype(object)
+        savings["card"] = cards.where(cards.notna(), NO_CARD).to_numpy()
+    if months is not None:
+        months = [str(month) for month in months]
+        savings = savings[savings["month"].isin(months)]
+    # Округляются траты по модулю, как в investment_bank по get_investment_frame и в investment_bank_batches
+    amounts = np.abs(to_kopecks(frame["Сумма операции"].to_numpy()[savings.index.to_numpy()]))
+    for limit in limits:
+        savings[limit] = rounding_kopecks(amounts, limit)
+    totals = savings.groupby(keys, sort=True).sum()
+
+    empty_cell = {} if by_card else {str(limit): 0.0 for limit in limits}
+    matrix: Dict[str, Any] = {month: dict(empty_cell) for month in months} if months is not None else {}
+    for row in totals.reset_index().to_dict(orient="records"):
+        cell = {str(limit): kopecks_to_rubles(row[limit]) for limit in limits}
+        if by_card:
+            matrix.setdefault(row["month"], {})[row["card"]] = cell
+        else:
+            matrix[row["month"]] = cell
+    logger.info("Инвесткопилка для %d месяцев и порогов %s", len(matrix), limits)
+
+    return dumps(matrix, pretty=True).decode("utf-8")
 
 
 # Проверка функции
@@ -0,0 +1,245 @@
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion import DATE_COLUMN, DATE_FORMAT, concat_operations
+from src.money import to_kopecks
+
+logger = logging.getLogger(__name__)
+
+CARD_COLUMN = "Номер карты"
+AMOUNT_COLUMN = "Сумма операции"
+CATEGORY_COLUMN = "Категория"
+
+WINDOW_UNITS = {"D": "days", "W": "weeks", "M": "months", "Y": "years"}
+
+CardIndex = Dict[str, Tuple[np.ndarray, np.ndarray]]
+CategoryIndex = Dict[str, Any]
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Разбор колонки дат операций, если она еще не в datetime64"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, format=DATE_FORMAT)
+
+
+def build_time_index(transactions: pd.DataFrame) -> pd.DataFrame:
+    """Хранилище операций: строки отсортированы по дате, индекс DatetimeIndex"""
+    dates = parse_dates(transactions[DATE_COLUMN])
+    if dates is transactions[DATE_COLUMN] and (dates.is_monotonic_increasing or dates.is_monotonic_decreasing):
+        # Уже упорядоченная выгрузка: хранилище разделяет данные с исходным датафреймом
+        indexed = transactions.iloc[::1] if dates.is_monotonic_increasing else transactions.iloc[::-1]
+        indexed = indexed.copy(deep=False)
+        indexed.index = pd.DatetimeIndex(indexed[DATE_COLUMN].to_numpy())
+    else:
+        values = dates.to_numpy()
+        order = np.argsort(values, kind="stable")
+        indexed = transactions.iloc[order].copy()
+        indexed[DATE_COLUMN] = values[order]
+        indexed.index = pd.DatetimeIndex(values[order])
+    logger.info("Построен временной индекс операций")
+
+    return indexed
+
+
+def append_time_index(indexed: pd.DataFrame, new_indexed: pd.DataFrame) -> pd.DataFrame:
+    """Хранилище операций с добавленным хранилищем новых строк без пересортировки старой части"""
+    if not len(new_indexed):
+        return indexed
+    if not len(indexed) or new_indexed.index[0] >= indexed.index[-1]:
+        return concat_operations([indexed, new_indexed])
+    # Операции задним числом: слияние двух упорядоченных частей, равные даты сохраняют порядок добавления
+    merged = concat_operations([indexed, new_indexed])
+    order = np.argsort(merged.index.to_numpy(), kind="stable")
+    return merged.iloc[order]
+
+
+def is_time_indexed(transactions: pd.DataFrame) -> bool:
+    """Проверка, что датафрейм построен через build_time_index"""
+    return isinstance(transactions.index, pd.DatetimeIndex) and transactions.index.is_monotonic_increasing
+
+
+def window(indexed: pd.DataFrame, start: datetime, end: datetime) -> pd.DataFrame:
+    """Операции в интервале [start, end] бинарным поиском, без копирования строк"""
+    left = indexed.index.searchsorted(start, side="left")
+    right = indexed.index.searchsorted(end, side="right")
+    return indexed.iloc[left:right]
+
+
+def month_to_date(indexed: pd.DataFrame, end: datetime) -> pd.DataFrame:
+    """Операции с начала месяца по указанную дату"""
+    return window(indexed, end.replace(day=1), end)
+
+
+def trailing_months(indexed: pd.DataFrame, end: datetime, months: int = 3) -> pd.DataFrame:
+    """Операции за последние months месяцев по указанную дату"""
+    return window(indexed, end - pd.DateOffset(months=months), end)
+
+
+def build_card_index(indexed: pd.DataFrame) -> CardIndex:
+    """Накопленные суммы операций по каждой карте в копейках, в порядке дат"""
+    card_index: CardIndex = {}
+    for card, group in indexed.groupby(CARD_COLUMN, sort=True, observed=True):
+        prefix = np.zeros(len(group) + 1, dtype=np.int64)
+        np.cumsum(to_kopecks(group[AMOUNT_COLUMN].to_numpy()), out=prefix[1:])
+        card_index[str(card)] = (group.index.to_numpy(), prefix)
+    logger.info("Построены накопленные суммы по %d картам", len(card_index))
+
+    return card_index
+
+
+def extend_card_index(card_index: CardIndex, new_indexed: pd.DataFrame) -> CardIndex:
+    """Накопленные суммы с новыми операциями, пересчитываются только затронутые карты"""
+    extended = dict(card_index)
+    for card, group in new_indexed.groupby(CARD_COLUMN, sort=True, observed=True):
+        dates, amounts = group.index.to_numpy(), to_kopecks(group[AMOUNT_COLUMN].to_numpy())
+        if str(card) in extended:
+            old_dates, old_prefix = extended[str(card)]
+            backdated = len(old_dates) and dates[0] < old_dates[-1]
+            dates = np.concatenate([old_dates, dates])
+            amounts = np.concatenate([np.diff(old_prefix), amounts])
+            if backdated:
+                order = np.argsort(dates, kind="stable")
+                dates, amounts = dates[order], amounts[order]
+        prefix = np.zeros(len(amounts) + 1, dtype=np.int64)
+        np.cumsum(amounts, out=prefix[1:])
+        extended[str(card)] = (dates, prefix)
+    logger.info("Накопленные суммы обновлены по %d картам", new_indexed[CARD_COLUMN].nunique())
+
+    return extended
+
+
+def card_totals(card_index: CardIndex, start: datetime, end: datetime) -> Dict[str, int]:
+    """Сумма операций по картам в интервале [start, end] в копейках"""
+    start64, end64 = np.datetime64(pd.Timestamp(start)), np.datetime64(pd.Timestamp(end))
+    totals = {}
+    for card, (dates, prefix) in card_index.items():
+        left = np.searchsorted(dates, start64, side="left")
+        right = np.searchsorted(dates, end64, side="right")
+        if right > left:
+            totals[card] = int(prefix[right] - prefix[left])
+    return totals
+
+
+def window_offset(length: Union[str, pd.DateOffset, pd.Timedelta]) -> Union[pd.DateOffset, pd.Timedelta]:
+    """Длина окна из записи вида 3M, 90D, 2W или 1Y, смещения и интервалы возвращаются как есть"""
+    if isinstance(length, (pd.DateOffset, pd.Timedelta)):
+        return length
+    match = re.fullmatch(r"\s*(\d+)\s*([DWMY])\s*", str(length).upper())
+    if match is None:
+        raise ValueError(f"Неверная длина окна {length!r}, ожидается например 3M, 90D, 2W или 1Y")
+    offset: Dict[str, Any] = {WINDOW_UNITS[match.group(2)]: int(match.group(1))}
+    return pd.DateOffset(**offset)
+
+
+def rolling_totals(dates: np.ndarray, prefix: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Суммы в копейках за интервалы [starts[i], ends[i]] по накопленным суммам упорядоченных по дате операций"""
+    left = np.searchsorted(dates, starts, side="left")
+    right = np.searchsorted(dates, ends, side="right")
+    return prefix[right] - prefix[left]
+
+
+def card_rolling_totals(card_index: CardIndex, starts: np.ndarray, ends: np.ndarray) -> Dict[str, np.ndarray]:
+    """Скользящие суммы по каждой карте в копейках для всех концов окна сразу"""
+    return {card: rolling_totals(dates, prefix, starts, ends) for card, (dates, prefix) in card_index.items()}
+
+
+def build_category_index(transactions: pd.DataFrame) -> CategoryIndex:
+    """Индекс категорий: коды категорий и позиции строк каждой категории в порядке дат"""
+    dates = parse_dates(transactions[DATE_COLUMN]).to_numpy()
+    codes, categories = pd.factorize(transactions[CATEGORY_COLUMN], sort=True)
+    order = np.lexsort((dates, codes))
+    boundaries = np.searchsorted(codes[order], np.arange(len(categories) + 1), side="left")
+    logger.info("Построен индекс по %d категориям", len(categories))
+
+    return {
+        "dates": dates,
+        "categories": pd.Index(categories),
+        "order": order,
+        "sorted_dates": dates[order],
+        "boundaries": boundaries,
+    }
+
+
+def extend_category_index(category_index: CategoryIndex, new_rows: pd.DataFrame) -> CategoryIndex:
+    """Индекс категорий с дописанными в конец строками без общей пересортировки"""
+    offset = len(category_index["dates"])
+    new = build_category_index(new_rows)
+    categories = category_index["categories"].union(new["categories"])
+    orders, sorted_dates = [], []
+    for category in categories:
+        parts = []
+        for index, shift in ((category_index, 0), (new, offset)):
+            if category in index["categories"]:
+                code = index["categories"].get_loc(category)
+                first, last = index["boundaries"][code], index["boundaries"][code + 1]
+                parts.append((index["order"][first:last] + shift, index["sorted_dates"][first:last]))
+        order = np.concatenate([part[0] for part in parts])
+        dates = np.concatenate([part[1] for part in parts])
+        if len(parts) == 2 and len(parts[0][1]) and len(parts[1][1]) and parts[1][1][0] < parts[0][1][-1]:
+            merged = np.argsort(dates, kind="stable")
+            order, dates = order[merged], dates[merged]
+        orders.append(order)
+        sorted_dates.append(dates)
+    logger.info("Индекс категорий дополнен %d строками", len(new_rows))
+
+    return {
+        "dates": np.concatenate([category_index["dates"], new["dates"]]),
+        "categories": categories,
+        "order": np.concatenate(orders).astype(np.intp),
+        "sorted_dates": np.concatenate(sorted_dates),
+        "boundaries": np.concatenate([[0], np.cumsum([len(order) for order in orders])]),
+    }
+
+
+def category_positions(category_index: CategoryIndex, category: str, start: datetime, end: datetime) -> np.ndarray:
+    """Позиции строк категории в интервале [start, end] в исходном порядке строк"""
+    categories = category_index["categories"]
+    if category not in categories:
+        return np.empty(0, dtype=np.intp)
+    code = categories.get_loc(category)
+    first, last = category_index["boundaries"][code], category_index["boundaries"][code + 1]
+    dates = category_index["sorted_dates"][first:last]
+    left = first + np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left")
+    right = first + np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side="right")
+    return np.sort(category_index["order"][left:right])
+
+
+def categories_window(
+    transactions: pd.DataFrame,
+    categories: List[str],
+    start: datetime,
+    end: datetime,
+    category_index: Optional[CategoryIndex] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Операции нескольких категорий в интервале по одному индексу, входной датафрейм не меняется"""
+    if category_index is None:
+        category_index = build_category_index(transactions)
+    result = {}
+    for category in categories:
+        positions = category_positions(category_index, category, start, end)
+        result[category] = transactions.iloc[positions].assign(**{DATE_COLUMN: category_index["dates"][positions]})
+    return result
+
+
+def category_rolling_totals(
+    transactions: pd.DataFrame, starts: np.ndarray, ends: np.ndarray, category_index: Optional[CategoryIndex] = None
+) -> Dict[str, np.ndarray]:
+    """Скользящие суммы по каждой категории в копейках: одни накопленные суммы на все категории"""
+    if category_index is None:
+        category_index = build_category_index(transactions)
+    amounts = to_kopecks(transactions[AMOUNT_COLUMN].to_numpy())[category_index["order"]]
+    prefix = np.zeros(len(amounts) + 1, dtype=np.int64)
+    np.cumsum(amounts, out=prefix[1:])
+    totals = {}
+    for code, category in enumerate(category_index["categories"]):
+        first, last = category_index["boundaries"][code], category_index["boundaries"][code + 1]
+        totals[str(category)] = rolling_totals(
+            category_index["sorted_dates"][first:last], prefix[first:last + 1], starts, ends
+        )
+    return totals
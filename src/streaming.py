@@ -0,0 +1,117 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from config import path_xlsx, stream_batch_size
+from src.ingestion import DATE_COLUMN, ROOT_PATH, parse_operations
+from src.logger import SampledEvents
+from src.store import AMOUNT_COLUMN, parse_dates
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(transactions: pd.DataFrame, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Разбиение датафрейма на последовательные куски без копирования"""
+    for start in range(0, len(transactions), chunk_size):
+        yield transactions.iloc[start:start + chunk_size]
+
+
+def _records_to_frame(batch: List[tuple], header: tuple) -> pd.DataFrame:
+    """Кусок строк листа в датафрейм с типами как у pd.read_excel"""
+    df = pd.DataFrame.from_records(batch, columns=header)
+    for column in df.columns:
+        values = df[column]
+        # pd.read_excel переводит целые значения ячеек в int, openpyxl отдает их как float
+        if values.dtype == "float64" and values.notna().all() and (values == values.round()).all():
+            df[column] = values.astype("int64")
+    return parse_operations(df, compact=False)
+
+
+def read_xlsx_batches(
+    file_path: Optional[Path] = None, batch_size: int = stream_batch_size
+) -> Iterator[pd.DataFrame]:
+    """Потоковое чтение эксель-файла кусками по batch_size строк с разобранными датами"""
+    from openpyxl import load_workbook
+
+    file_path = Path(ROOT_PATH, path_xlsx) if file_path is None else Path(file_path)
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    batches_read = SampledEvents(logger, f"Потоковое чтение {file_path.name}, куски", "%d строк")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        with batches_read:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    batches_read(len(batch))
+                    yield _records_to_frame(batch, header)
+                    batch = []
+            if batch:
+                batches_read(len(batch))
+                yield _records_to_frame(batch, header)
+    finally:
+        workbook.close()
+
+
+def _chunk_candidates(chunk: pd.DataFrame, top_n: int, by: Optional[str]) -> pd.DataFrame:
+    """Строки куска, которые могут попасть в топ: N наибольших сумм с учетом равных"""
+    if by is None:
+        candidates = chunk.nlargest(top_n, AMOUNT_COLUMN, keep="all")
+    else:
+        ranks = chunk.groupby(by, sort=False, observed=True)[AMOUNT_COLUMN].rank(method="min", ascending=False)
+        candidates = chunk[(ranks <= top_n).to_numpy()]
+    return candidates.assign(**{DATE_COLUMN: parse_dates(candidates[DATE_COLUMN])})
+
+
+def _select_top(candidates: pd.DataFrame, top_n: int, by: Optional[str]) -> pd.DataFrame:
+    """N наибольших сумм, при равных суммах выше более поздняя операция"""
+    ordered = candidates.sort_values([AMOUNT_COLUMN, DATE_COLUMN], ascending=False, kind="stable")
+    return ordered.head(top_n) if by is None else ordered.groupby(by, sort=False, observed=True).head(top_n)
+
+
+def _format_records(top: pd.DataFrame) -> List[Dict[Hashable, Any]]:
+    """Словари победивших строк с датой в виде строки, пропуски как None"""
+    top = top.assign(**{DATE_COLUMN: top[DATE_COLUMN].dt.strftime("%Y-%m-%d %H:%M:%S")}).astype(object)
+    return top.where(top.notna(), None).to_dict(orient="records")
+
+
+def _stream_top(
+    chunks: Iterable[pd.DataFrame], top_n: int, groupings: List[Optional[str]]
+) -> Dict[Optional[str], Optional[pd.DataFrame]]:
+    """Один проход по кускам с отбором топа для каждой группировки"""
+    best: Dict[Optional[str], Optional[pd.DataFrame]] = {by: None for by in groupings}
+    for chunk in chunks:
+        for by, current in best.items():
+            candidates = _chunk_candidates(chunk, top_n, by)
+            if current is not None:
+                candidates = pd.concat([current, candidates])
+            best[by] = _select_top(candidates, top_n, by)
+    return best
+
+
+def top_transactions(chunks: Iterable[pd.DataFrame], top_n: int = 5) -> List[Dict[Hashable, Any]]:
+    """Топ операций по сумме за один проход по кускам, в памяти не больше N строк"""
+    best = _stream_top(chunks, top_n, [None])[None]
+    logger.info("Получение топа операций по сумме")
+
+    return [] if best is None else _format_records(best)
+
+
+def top_transactions_by(
+    chunks: Iterable[pd.DataFrame], by: List[str], top_n: int = 5
+) -> Dict[str, Dict[Any, List[Dict[Hashable, Any]]]]:
+    """Топ операций по сумме внутри каждой карты, категории и т.п. за один проход по кускам"""
+    best = _stream_top(chunks, top_n, list(by))
+    logger.info("Получение топа операций по группам %s", list(by))
+
+    return {
+        str(column): {}
+        if top is None
+        else {group: _format_records(rows) for group, rows in top.groupby(column, observed=True)}
+        for column, top in best.items()
+    }
@@ -1,15 +1,23 @@
 import json
 import os
 import logging
+import threading
+import numpy as np
 import pandas as pd
-import requests
 from datetime import datetime
-import yfinance as yf
-from typing import Dict, List, Any, Hashable, Optional
+from typing import Callable, Dict, Iterable, List, Any, Hashable, Optional, Tuple, Union
 from dotenv import load_dotenv
 from pathlib import Path
 from typing import Any, Dict, List, Hashable
 from config import path_xlsx
+from src.ingestion import account_workbooks, file_fingerprint, ingest_operations, read_accounts
+from src.market import QuoteProvider, default_quote_provider, fetch_currency_quotes, missing_quotes
+from src.money import cashback_kopecks, to_kopecks
+from src.profiling import instrumented
+from src.streaming import top_transactions
+from src.store import (CardIndex, CategoryIndex, append_time_index, build_card_index, build_category_index,
+                       build_time_index, card_totals, extend_card_index, extend_category_index, is_time_indexed,
+                       month_to_date, parse_dates)
 
 ROOT_PATH = Path(__file__).resolve().parent.parent
 
@@ -17,22 +25,17 @@ load_dotenv()
 
 api_key = os.getenv("API_KEY")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler(
-            Path(ROOT_PATH, "logs/utils.log"), mode="w", encoding="utf-8"
-        ),
-    ],
-)
+logger = logging.getLogger(__name__)
 
 
+@instrumented()
 def from_xlsx() -> list[dict[Hashable, Any]]:
     """Преобразование из эксель-файла в python-объект"""
-    df = pd.read_excel(Path(ROOT_PATH, path_xlsx))
-    logging.error("File not found")
+    try:
+        df = pd.read_excel(Path(ROOT_PATH, path_xlsx))
+    except FileNotFoundError:
+        logger.error("Файл операций не найден: %s", path_xlsx)
+        raise
     list_of_dicts = df.to_dict(orient="records")
 
     return list_of_dicts
@@ -54,7 +57,7 @@ def investment_dict(
         {k: v for k, v in d.items() if k in keys_to_keep}
         for d in transactions_for_invest
     ]
-    logging.info("Формирование словаря списков")
+    logger.info("Формирование словаря списков")
     return list_for_invest
 
 
@@ -65,24 +68,168 @@ def convert_date_format(date_str: str) -> str:
     return date_obj.strftime("%Y-%m-%d")
 
 
-transactions = from_xlsx()
+_data: Dict[str, Any] = {}
+_data_lock = threading.RLock()
 
-list_for_investment = [
-    {
-        "Дата операции": convert_date_format(item["Дата операции"]),
-        "Сумма операции": abs(item["Сумма операции"]),
-    }
-    for item in investment_dict(transactions)
-]
 
-list_df = list_to_df(transactions)
+def _memoized(name: str, build: Callable[[], Any]) -> Any:
+    """Ленивая загрузка и запоминание данных при первом обращении"""
+    with _data_lock:
+        if name not in _data:
+            _data[name] = build()
+        return _data[name]
 
 
+def path_fingerprint(file_path: Union[str, Path]) -> Optional[tuple]:
+    """Отпечаток файла для ключа кэша, None если файла нет"""
+    try:
+        return tuple(file_fingerprint(Path(file_path)).values())
+    except OSError:
+        return None
+
+
+def source_fingerprint() -> Optional[tuple]:
+    """Отпечаток выгрузок: всех файлов по счетам или основного файла"""
+    workbooks = account_workbooks()
+    if workbooks:
+        return tuple((path.name, path_fingerprint(path)) for path in workbooks)
+    return path_fingerprint(Path(ROOT_PATH, path_xlsx))
+
+
+def loaded_fingerprint(default: Optional[tuple] = None) -> Optional[tuple]:
+    """Отпечаток выгрузок, из которых загружены операции; подставленному датафрейму присваивается default"""
+    with _data_lock:
+        if "list_df" not in _data:
+            return default
+        return _data.setdefault("source_fingerprint", default)
+
+
+def load_transactions() -> pd.DataFrame:
+    """Операции из выгрузок по счетам, если они есть, иначе из основной выгрузки"""
+    if account_workbooks():
+        return read_accounts()
+    return ingest_operations()[0]
+
+
+def _load_list_df() -> pd.DataFrame:
+    """Загрузка операций, отпечаток выгрузок снимается до чтения"""
+    _data["source_fingerprint"] = source_fingerprint()
+    return load_transactions()
+
+
+def get_list_df() -> pd.DataFrame:
+    """Датафрейм всех операций, загружается при первом обращении"""
+    return _memoized("list_df", _load_list_df)
+
+
+def get_transaction_index() -> pd.DataFrame:
+    """Операции, отсортированные по дате, для быстрых выборок по периодам"""
+    return _memoized("transaction_index", lambda: build_time_index(get_list_df()))
+
+
+def get_card_index() -> CardIndex:
+    """Накопленные суммы операций по картам для быстрых итогов за период"""
+    return _memoized("card_index", lambda: build_card_index(get_transaction_index()))
+
+
+def get_category_index() -> CategoryIndex:
+    """Индекс категорий загруженных операций, сбрасывается вместе с ними"""
+    return _memoized("category_index", lambda: build_category_index(get_list_df()))
+
+
+def get_category_data() -> Tuple[pd.DataFrame, CategoryIndex]:
+    """Операции вместе с их индексом категорий, взятые под одной блокировкой"""
+    with _data_lock:
+        return get_list_df(), get_category_index()
+
+
+def get_transactions() -> List[Dict[Hashable, Any]]:
+    """Список словарей всех операций, строится при каждом вызове и не хранится"""
+    return get_list_df().to_dict(orient="records")
+
+
+def get_investment_frame() -> pd.DataFrame:
+    """Дата и сумма операций по модулю для инвесткопилки"""
+    list_df = get_list_df()
+    return pd.DataFrame(
+        {"Дата операции": list_df["Дата операции"], "Сумма операции": list_df["Сумма операции"].abs()}
+    )
+
+
+def get_list_for_investment() -> List[Dict[str, Any]]:
+    """Список операций с датой и суммой для инвесткопилки, строится при каждом вызове"""
+    investment_frame = get_investment_frame()
+    return [
+        {
+            "Дата операции": date,
+            "Сумма операции": amount,
+        }
+        for date, amount in zip(
+            investment_frame["Дата операции"].dt.strftime("%Y-%m-%d"), investment_frame["Сумма операции"]
+        )
+    ]
+
+
+def reload_transactions(list_df: Optional[pd.DataFrame] = None) -> None:
+    """Сброс загруженных операций или подмена их переданным датафреймом"""
+    with _data_lock:
+        _data.clear()
+        if list_df is not None:
+            _data["list_df"] = list_df
+    logger.info("Сброс загруженных операций")
+
+
+def _ingest_transactions(file_path: Optional[Path]) -> pd.DataFrame:
+    """Дозагрузка выгрузки в загруженные операции с дополнением построенных индексов"""
+    if file_path is None and account_workbooks():
+        # Выгрузки по счетам перечитываются целиком, неизмененные файлы берутся из кэша
+        list_df = read_accounts()
+        reload_transactions(list_df)
+        return list_df
+
+    with _data_lock:
+        list_df, new_rows = ingest_operations(file_path)
+        loaded = _data.get("list_df")
+        if loaded is not None and not len(new_rows):
+            return new_rows
+        if loaded is None or len(loaded) != len(list_df) - len(new_rows):
+            # Загруженные данные не являются началом накопленной таблицы, индексы строятся заново
+            reload_transactions(list_df)
+            return new_rows
+
+        if "transaction_index" in _data:
+            new_indexed = build_time_index(new_rows)
+            _data["transaction_index"] = append_time_index(_data["transaction_index"], new_indexed)
+            if "card_index" in _data:
+                _data["card_index"] = extend_card_index(_data["card_index"], new_indexed)
+        if "category_index" in _data:
+            _data["category_index"] = extend_category_index(_data["category_index"], new_rows)
+        _data["list_df"] = list_df
+    logger.info("Добавлено операций: %d", len(new_rows))
+
+    return new_rows
+
+
+def ingest_transactions(file_path: Optional[Path] = None) -> pd.DataFrame:
+    """Дозагрузка новых операций из выгрузки с обновлением уже построенных индексов"""
+    # Отпечаток снимается до чтения: файл, записанный во время дозагрузки, будет прочитан при следующей проверке
+    fingerprint = source_fingerprint()
+    new_rows = _ingest_transactions(file_path)
+    if file_path is None:
+        with _data_lock:
+            _data["source_fingerprint"] = fingerprint
+    return new_rows
+
+
+@instrumented()
 def load_user_settings(file_path: str = "user_settings.json") -> Dict[str, List[str]]:
     """Считывание настроек пользователя"""
-    with open(file_path, "r", encoding="utf-8") as file:
-        settings = json.load(file)
-        logging.error("File not found")
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            settings = json.load(file)
+    except FileNotFoundError:
+        logger.error("Файл настроек не найден: %s", file_path)
+        raise
     return settings
 
 
@@ -90,7 +237,7 @@ def get_greeting(current_time: Optional[datetime] = None) -> str:
     """Обработка блока Приветствие"""
     if current_time is None:
         current_time = datetime.now()
-        logging.info(f"Преобразование даты: {current_time}")
+        logger.info("Преобразование даты: %s", current_time)
     hour = current_time.hour
     if 6 <= hour < 12:
         return "Доброе утро"
@@ -102,71 +249,94 @@ def get_greeting(current_time: Optional[datetime] = None) -> str:
         return "Доброй ночи"
 
 
+@instrumented()
 def filter_transactions(transactions: pd.DataFrame, date: str) -> pd.DataFrame:
     """Фильтрация транзакций по дате"""
     end_date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
     start_date = end_date.replace(day=1)
+    logger.info("Фильтрация транзакций")
 
-    # Создаем явную копию DataFrame
-    transactions = transactions.copy()
+    if is_time_indexed(transactions):
+        return month_to_date(transactions, end_date)
 
-    # Используем .loc для явного указания изменений
-    transactions.loc[:, "Дата операции"] = pd.to_datetime(
-        transactions["Дата операции"], format="%d.%m.%Y %H:%M:%S"
-    )
-    logging.info("Фильтрация транзакций")
+    dates = parse_dates(transactions["Дата операции"])
+    if dates is not transactions["Дата операции"]:
+        transactions = transactions.assign(**{"Дата операции": dates})
+
+    return transactions[(dates >= start_date) & (dates <= end_date)]
 
-    return transactions[
-        (transactions["Дата операции"] >= start_date)
-        & (transactions["Дата операции"] <= end_date)
-        ]
 
+def card_stats_records(totals: Dict[Any, int]) -> List[Dict[Hashable, Any]]:
+    """Итоги и кэшбек по картам из сумм в копейках"""
+    cards = sorted(totals)
+    kopecks = np.array([totals[card] for card in cards], dtype=np.int64)
+    total_spent = kopecks / 100
+    cashback = cashback_kopecks(kopecks) / 100
 
-def calculate_card_stats(filtered_transactions: pd.DataFrame) -> List[Dict[Hashable, Any]]:
+    return [
+        {
+            "Номер карты": card,
+            "total_spent": float(spent),
+            "cashback": float(card_cashback),
+            "last_digits": str(card)[-4:],
+        }
+        for card, spent, card_cashback in zip(cards, total_spent, cashback)
+    ]
+
+
+@instrumented()
+def calculate_card_stats(
+        filtered_transactions: pd.DataFrame, card_index: Optional[CardIndex] = None
+) -> List[Dict[Hashable, Any]]:
     """Подсчет суммы операций и кэшбека по картам"""
-    card_stats = (
-        filtered_transactions.groupby("Номер карты")
-        .agg(
-            total_spent=("Сумма операции", "sum"),
-            cashback=("Сумма операции", (lambda x: abs(round(x.sum() / 100, 2)))),
-        )
-        .reset_index()
-    )
-    card_stats["last_digits"] = card_stats["Номер карты"].astype(str).str[-4:]
-    logging.info("Формирование транзакций по картам")
+    totals: Dict[Any, int]
+    if card_index is not None and is_time_indexed(filtered_transactions):
+        # Отсортированный срез хранилища совпадает с интервалом от первой до последней даты
+        if len(filtered_transactions):
+            totals = card_totals(card_index, filtered_transactions.index[0], filtered_transactions.index[-1])
+        else:
+            totals = {}
+    else:
+        kopecks = pd.Series(to_kopecks(filtered_transactions["Сумма операции"].to_numpy()))
+        totals = kopecks.groupby(filtered_transactions["Номер карты"].to_numpy()).sum().to_dict()
+    logger.info("Формирование транзакций по картам")
+
+    return card_stats_records(totals)
+
 
-    return card_stats.to_dict(orient="records")
+def card_stats_batches(batches: Iterable[pd.DataFrame], date: str) -> List[Dict[Hashable, Any]]:
+    """Подсчет суммы операций и кэшбека по картам по потоку кусков операций"""
+    totals: Dict[Any, int] = {}
+    for batch in batches:
+        filtered = filter_transactions(batch, date)
+        kopecks = pd.Series(to_kopecks(filtered["Сумма операции"].to_numpy()))
+        for card, total in kopecks.groupby(filtered["Номер карты"].to_numpy()).sum().items():
+            totals[card] = totals.get(card, 0) + int(total)
+    logger.info("Формирование транзакций по картам по потоку операций")
 
+    return card_stats_records(totals)
 
+
+@instrumented()
 def get_top_transactions(
         filtered_transactions: pd.DataFrame, top_n: int = 5
 ) -> list[dict[Hashable, Any]]:
     """Филтрация последних 5 транзакций"""
-    filtered_transactions["Дата операции"] = pd.to_datetime(
-        filtered_transactions["Дата операции"], format="%Y-%m-%d %H:%M:%S"
-    ).dt.strftime("%Y-%m-%d %H:%M:%S")
-    top_transactions = filtered_transactions.nlargest(top_n, "Сумма операции")
-    logging.info("Получение последних 5 транзакций")
-    return top_transactions.to_dict(orient="records")
+    top = top_transactions([filtered_transactions], top_n)
+    logger.info("Получение последних 5 транзакций")
+    return top
 
 
+@instrumented()
 def get_currency_rates(currencies: List[str]) -> List[Dict[str, Any]]:
     """Получение по АПИ курсов валют"""
-    symbols = ",".join(currencies)
-
-    url = f"https://api.apilayer.com/currency_data/live?symbols={symbols}"
-    headers = {"apikey": api_key}
-
-    response = requests.get(url, headers=headers)
-    logging.error("Ошибка соединения с сервером")
-
-    data = response.json()
-
-    quotes = data.get("quotes", {})
-    usd_to_rub = quotes.get("USDRUB")
-    usd_to_eur = quotes.get("USDEUR")
-    rub_to_eur = usd_to_rub / usd_to_eur
-    logging.info("Формирование курса валют")
+    quotes = fetch_currency_quotes(currencies)
+    missing = missing_quotes(["RUB", "EUR"], quotes)
+    if missing:
+        raise ValueError(f"Нет курсов доллара к {', '.join(missing)}")
+    usd_to_rub = quotes["USDRUB"]
+    rub_to_eur = usd_to_rub / quotes["USDEUR"]
+    logger.info("Формирование курса валют")
 
     return [
         {"currency": "USD", "rate": round(usd_to_rub, 2)},
@@ -174,18 +344,13 @@ def get_currency_rates(currencies: List[str]) -> List[Dict[str, Any]]:
     ]
 
 
-def get_stock_prices(stocks: List[str]) -> List[Dict[str, float]]:
+@instrumented()
+def get_stock_prices(stocks: List[str], provider: Optional[QuoteProvider] = None) -> List[Dict[str, Any]]:
     """Получение по АПИ курсов акций"""
-    stock_prices = []
-    for my_stock in stocks:
-        stock = yf.Ticker(my_stock)
-        data = stock.history(period="1d")
-        json_data = json.loads(data.to_json(orient="index"))
-        # Получаем цену закрытия для последнего доступного дня
-        price = json_data[list(json_data.keys())[0]]["Close"]
-
-        stock_prices.append({"stock": my_stock, "price": round(price, 2)})
-    logging.info("Формирование курса акций")
+    provider = default_quote_provider if provider is None else provider
+    prices = provider.get_close_prices(list(stocks))
+    stock_prices = [{"stock": my_stock, "price": round(prices[my_stock], 2)} for my_stock in stocks]
+    logger.info("Формирование курса акций")
 
     return stock_prices
 
@@ -199,10 +364,23 @@ def df_for_main():
     return date_frame
 
 
-df = df_for_main()
+_lazy_attributes: Dict[str, Callable[[], Any]] = {
+    "list_df": get_list_df,
+    "transactions": get_transactions,
+    "list_for_investment": get_list_for_investment,
+    "df": df_for_main,
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Ленивый доступ к данным модуля: list_df, transactions, list_for_investment, df"""
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # print(transactions[:5])
-    print(list_for_investment[:3])
+    print(get_list_for_investment()[:3])
     # print(list_to_df(transactions[:5]))
     # print(transactions[:5])
@@ -1,12 +1,26 @@
+import hashlib
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 import pandas as pd
 from dotenv import load_dotenv
+from config import (market_workers, path_cache, profiling_trace, report_analytics_ttl, report_disk_cache,
+                    report_market_ttl, report_section_timeouts, report_workers)
+from src.caching import TTLCache
+from src.profiling import instrumented, stage, trace_request, write_trace
+from src.serialization import dumps
 from src.utils import (load_user_settings, get_greeting, filter_transactions, calculate_card_stats,
-                       get_top_transactions, get_currency_rates, get_stock_prices, df)
+                       get_top_transactions, get_currency_rates, get_stock_prices, get_transaction_index, df,
+                       get_card_index, ingest_transactions, loaded_fingerprint, path_fingerprint, source_fingerprint)
+from src.store import CardIndex
+from src.writer import write_atomic
 
 load_dotenv()
 
@@ -15,50 +29,264 @@ api_key = os.getenv("API_KEY")
 ROOT_PATH = Path(__file__).resolve().parent.parent
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler(
-            Path(ROOT_PATH, "logs/repots.log"), mode="w", encoding="utf-8"
-        ),
-    ],
-)
+logger = logging.getLogger(__name__)
 
 
-def generate_report(dataframe: pd.DataFrame) -> str:
-    """Создание финального отчета для пользователя"""
-    datetime_str = dataframe['datetime'].iloc[0]
+_market_pool: Optional[ThreadPoolExecutor] = None
+_market_pool_lock = threading.Lock()
+
+
+def get_market_pool() -> ThreadPoolExecutor:
+    """Общий пул запросов рыночных данных, создается при первом обращении"""
+    global _market_pool
+    with _market_pool_lock:
+        if _market_pool is None:
+            _market_pool = ThreadPoolExecutor(max_workers=market_workers, thread_name_prefix="market")
+        return _market_pool
+
+
+def collect_sections(
+    futures: Dict[str, Future], started: float, timeouts: Dict[str, float]
+) -> tuple[Dict[str, Any], List[str]]:
+    """Ожидание разделов отчета с учетом тайм-аутов, недоступные разделы пустые"""
+    sections: Dict[str, Any] = {}
+    unavailable = []
+    for name, future in futures.items():
+        remaining = max(started + timeouts[name] - time.monotonic(), 0)
+        try:
+            sections[name] = future.result(timeout=remaining)
+        except Exception as error:
+            logger.error("Раздел %s недоступен: %r", name, error)
+            sections[name] = []
+            unavailable.append(name)
+    return sections, unavailable
+
+
+analytics_cache = TTLCache(maxsize=256, ttl=report_analytics_ttl)
+market_cache = TTLCache(maxsize=32, ttl=report_market_ttl)
+
+_fingerprints: Dict[str, Any] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def invalidate_report_cache() -> None:
+    """Явный сброс кэшей главной страницы, в том числе на диске"""
+    analytics_cache.clear()
+    market_cache.clear()
+    for cached_file in Path(ROOT_PATH, path_cache, "reports").glob("*.json"):
+        cached_file.unlink(missing_ok=True)
+    logger.info("Кэш главной страницы сброшен")
+
+
+@instrumented()
+def check_sources(settings_path: str = "user_settings.json") -> tuple[Optional[tuple], Optional[tuple]]:
+    """Отпечатки загруженных операций и настроек; при изменении выгрузки дозагружаются данные и сбрасываются кэши"""
+    data_fingerprint = source_fingerprint()
+    settings_fingerprint = path_fingerprint(settings_path)
+    with _fingerprints_lock:
+        # Отпечаток загруженных данных записывается при их загрузке, а не при первой проверке
+        if loaded_fingerprint(data_fingerprint) != data_fingerprint:
+            # Новая выгрузка дописывает только новые операции и дополняет индексы
+            ingest_transactions()
+            invalidate_report_cache()
+        elif _fingerprints.get("settings", settings_fingerprint) != settings_fingerprint:
+            market_cache.clear()
+        _fingerprints.update(settings=settings_fingerprint)
+    return loaded_fingerprint(data_fingerprint), settings_fingerprint
+
+
+def _disk_path(key: tuple) -> Path:
+    """Файл кэша на диске для ключа аналитической части отчета"""
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+    return Path(ROOT_PATH, path_cache, "reports", f"{digest}.json")
+
+
+@instrumented()
+def build_analytics(
+    transactions: pd.DataFrame, datetime_str: str, card_index: Optional[CardIndex] = None
+) -> Dict[str, Any]:
+    """Разделы отчета, зависящие только от операций: приветствие, карты, топ транзакций"""
+    filtered_transactions = filter_transactions(transactions, datetime_str)
+
+    card_stats = calculate_card_stats(filtered_transactions, card_index)
+
+    top_transactions = get_top_transactions(filtered_transactions)
+
+    current_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
+    greeting = get_greeting(current_time)
+
+    return {"greeting": greeting, "cards": card_stats, "top_transactions": top_transactions}
+
+
+@instrumented()
+def cached_analytics(datetime_str: str, data_fingerprint: Optional[tuple]) -> Dict[str, Any]:
+    """Аналитическая часть отчета из кэша в памяти, с диска или расчетом"""
+    key = (data_fingerprint, datetime_str)
+    analytics = analytics_cache.get(key)
+    if analytics is not None:
+        return analytics
+
+    disk_path = _disk_path(key)
+    if report_disk_cache and disk_path.exists() and time.time() - disk_path.stat().st_mtime < report_analytics_ttl:
+        with open(disk_path, "r", encoding="utf-8") as file:
+            analytics = json.load(file)
+    else:
+        analytics = build_analytics(get_transaction_index(), datetime_str, get_card_index())
+        if report_disk_cache:
+            # Файл читают другие потоки и процессы, поэтому он заменяется целиком
+            write_atomic(disk_path, dumps(analytics))
+
+    analytics_cache.set(key, analytics)
+    return analytics
+
+
+def build_report(
+    datetime_str: str, transactions: Optional[pd.DataFrame] = None, timeouts: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Разделы отчета: рыночные данные запрашиваются параллельно с расчетами по операциям"""
+    timeouts = {**report_section_timeouts, **(timeouts or {})}
+    data_fingerprint, settings_fingerprint = check_sources()
     settings = load_user_settings()
     user_currencies = settings.get("user_currencies", [])
     user_stocks = settings.get("user_stocks", [])
 
-    transactions = pd.read_excel(Path(ROOT_PATH, "data/operations.xlsx"))
+    market_key = (settings_fingerprint, tuple(user_currencies), tuple(user_stocks))
+    market = market_cache.get(market_key)
+    if market is None:
+        started = time.monotonic()
+        market_pool = get_market_pool()
+        market_futures = {
+            "currency_rates": market_pool.submit(copy_context().run, get_currency_rates, user_currencies),
+            "stock_prices": market_pool.submit(copy_context().run, get_stock_prices, user_stocks),
+        }
 
-    filtered_transactions = filter_transactions(transactions, datetime_str)
+    if transactions is None:
+        analytics = cached_analytics(datetime_str, data_fingerprint)
+    else:
+        analytics = build_analytics(transactions, datetime_str)
 
-    card_stats = calculate_card_stats(filtered_transactions)
+    unavailable: List[str] = []
+    if market is None:
+        with stage("views.collect_sections"):
+            market, unavailable = collect_sections(market_futures, started, timeouts)
+        if not unavailable:
+            market_cache.set(market_key, market)
 
-    top_transactions = get_top_transactions(filtered_transactions)
+    logger.info("Формирование финального отчета для пользователя")
 
-    currency_rates = get_currency_rates(user_currencies)
+    return _assemble_report(analytics, market, unavailable)
 
-    stock_prices = get_stock_prices(user_stocks)
 
-    current_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
-    greeting = get_greeting(current_time)
+def generate_report(
+    dataframe: Union[pd.DataFrame, str],
+    transactions: Optional[pd.DataFrame] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    trace: Optional[str] = profiling_trace,
+    profile: Optional[str] = None,
+) -> str:
+    """Создание финального отчета для пользователя
+
+    trace="report" добавляет в отчет трассу этапов, trace="file" дописывает ее в файл метрик,
+    profile="cprofile" или "tracemalloc" сохраняет снимок профилировщика для этого запроса.
+    """
+    datetime_str = dataframe if isinstance(dataframe, str) else dataframe['datetime'].iloc[0]
+    if trace is None and profile is None:
+        return _report_json(build_report(datetime_str, transactions, timeouts))
+    if trace not in (None, "report", "file"):
+        raise ValueError(f"Неизвестный режим трассы {trace}")
+
+    with trace_request(profile) as request_trace:
+        report = build_report(datetime_str, transactions, timeouts)
+        report_json = _report_json(report)
+    if request_trace.profile_path is not None:
+        logger.info("Снимок профиля запроса сохранен в %s", request_trace.profile_path)
+    if trace == "file":
+        write_trace(request_trace, datetime_str)
+    elif trace == "report":
+        report_json = _report_json({**report, "trace": request_trace.to_dict()})
+
+    return report_json
 
+
+def _assemble_report(analytics: Dict[str, Any], market: Dict[str, Any], unavailable: List[str]) -> Dict[str, Any]:
+    """Сборка отчета из аналитической и рыночной частей"""
     report = {
-        "greeting": greeting,
-        "cards": card_stats,
-        "top_transactions": top_transactions,
-        "currency_rates": currency_rates,
-        "stock_prices": stock_prices,
+        **analytics,
+        "currency_rates": market["currency_rates"],
+        "stock_prices": market["stock_prices"],
     }
-    logging.info("Формирование финального отчета для пользователя")
+    if unavailable:
+        report["unavailable"] = unavailable
+    return report
+
+
+@instrumented("views.json_dumps")
+def _report_json(report: Dict[str, Any]) -> str:
+    """Отчет в JSON с отступами"""
+    return dumps(report, pretty=True).decode("utf-8")
+
+
+def generate_reports(
+    requests: Iterable[Tuple[Dict[str, List[str]], str]],
+    workers: Optional[int] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Tuple[List[str], Dict[str, float]]:
+    """Пакетное создание отчетов для пар (настройки пользователя, дата) и пропускная способность"""
+    started = time.monotonic()
+    requests = list(requests)
+    timeouts = {**report_section_timeouts, **(timeouts or {})}
+    data_fingerprint, _ = check_sources()
+    # Операции и индексы загружаются один раз до раздачи задач обработчикам
+    get_transaction_index()
+    get_card_index()
+
+    # Один запрос рыночных данных на набор валют и один на все акции всех пользователей
+    currency_sections = {
+        key: f"currency_rates:{','.join(key)}"
+        for key in dict.fromkeys(tuple(settings.get("user_currencies", [])) for settings, _ in requests)
+    }
+    all_stocks = sorted({stock for settings, _ in requests for stock in settings.get("user_stocks", [])})
+    market_futures: Dict[str, Future] = {}
+    section_timeouts: Dict[str, float] = {}
+    market_pool = get_market_pool()
+    for key, name in currency_sections.items():
+        market_futures[name] = market_pool.submit(copy_context().run, get_currency_rates, list(key))
+        section_timeouts[name] = timeouts["currency_rates"]
+    if all_stocks:
+        market_futures["stock_prices"] = market_pool.submit(copy_context().run, get_stock_prices, all_stocks)
+        section_timeouts["stock_prices"] = timeouts["stock_prices"]
+
+    datetimes = list(dict.fromkeys(datetime_str for _, datetime_str in requests))
+    with ThreadPoolExecutor(max_workers=workers or report_workers, thread_name_prefix="report") as pool:
+        analytics = dict(
+            zip(datetimes, pool.map(lambda datetime_str: cached_analytics(datetime_str, data_fingerprint), datetimes))
+        )
+
+    sections, unavailable_sections = collect_sections(market_futures, started, section_timeouts)
+    prices = {row["stock"]: row["price"] for row in sections.get("stock_prices", [])}
+
+    reports = []
+    for settings, datetime_str in requests:
+        currency_section = currency_sections[tuple(settings.get("user_currencies", []))]
+        user_stocks = settings.get("user_stocks", [])
+        unavailable = []
+        if currency_section in unavailable_sections:
+            unavailable.append("currency_rates")
+        if user_stocks and "stock_prices" in unavailable_sections:
+            unavailable.append("stock_prices")
+        market = {
+            "currency_rates": sections[currency_section],
+            "stock_prices": [{"stock": stock, "price": prices[stock]} for stock in user_stocks if stock in prices],
+        }
+        reports.append(_report_json(_assemble_report(analytics[datetime_str], market, unavailable)))
+
+    elapsed = time.monotonic() - started
+    stats = {"reports": len(reports), "seconds": elapsed, "reports_per_second": len(reports) / elapsed}
+    logger.info(
+        "Сформировано отчетов: %d за %.2f с, %.1f отчетов/с", len(reports), elapsed, stats["reports_per_second"]
+    )
 
-    return json.dumps(report, ensure_ascii=False, indent=4)
+    return reports, stats
 
 
 # Пример вызова функции
@@ -0,0 +1,140 @@
+import atexit
+import gzip
+import logging
+import os
+import queue
+import secrets
+import stat
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from config import report_writer_queue_size
+
+logger = logging.getLogger(__name__)
+
+ReportData = Union[str, bytes, Iterable[str]]
+
+CHUNK_SIZE = 1 << 20
+
+
+def _iter_bytes(data: ReportData, chunk_size: int) -> Iterable[bytes]:
+    """Данные отчета кусками байтов, без полной копии в памяти"""
+    if isinstance(data, bytes):
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+    elif isinstance(data, str):
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size].encode("utf-8")
+    else:
+        for part in data:
+            yield part.encode("utf-8")
+
+
+def _create_temp(file_path: Path) -> Tuple[int, str]:
+    """Новый временный файл рядом с целевым с правами как у open(..., "w"): 0666 с учетом маски процесса"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp_name = str(file_path.with_name(f".{file_path.name}.{secrets.token_hex(4)}.tmp"))
+        try:
+            return os.open(tmp_name, flags, 0o666), tmp_name
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def atomic_file(file_path: Union[str, Path]) -> Iterator[IO[bytes]]:
+    """Файл для записи во временном файле рядом с целевым, при успехе атомарно заменяет целевой"""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = _create_temp(file_path)
+    try:
+        with os.fdopen(fd, "wb") as raw_file:
+            yield raw_file
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        # Заменяемый файл сохраняет свои права
+        if file_path.exists():
+            os.chmod(tmp_name, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_atomic(file_path: Union[str, Path], data: ReportData, compress: bool = False,
+                 chunk_size: int = CHUNK_SIZE) -> Path:
+    """Запись отчета во временный файл и атомарная замена целевого файла"""
+    file_path = Path(file_path)
+    if compress and file_path.suffix != ".gz":
+        file_path = file_path.with_name(file_path.name + ".gz")
+
+    with atomic_file(file_path) as raw_file:
+        if compress:
+            with gzip.GzipFile(fileobj=raw_file, mode="wb") as gzip_file:
+                for chunk in _iter_bytes(data, chunk_size):
+                    gzip_file.write(chunk)
+        else:
+            for chunk in _iter_bytes(data, chunk_size):
+                raw_file.write(chunk)
+
+    return file_path
+
+
+class ReportWriter:
+    """Фоновая запись отчетов: очередь с ограниченным размером и одним потоком записи"""
+
+    def __init__(self, maxsize: int = report_writer_queue_size) -> None:
+        self.errors: List[BaseException] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                write_atomic(*task)
+            except Exception as error:
+                logger.error("Ошибка записи отчета: %r", error)
+                self.errors.append(error)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, file_path: Union[str, Path], data: ReportData, compress: bool = False) -> None:
+        """Постановка отчета в очередь; при заполненной очереди вызывающий поток ждет"""
+        if self._closed:
+            raise RuntimeError("ReportWriter is closed")
+        self._queue.put((file_path, data, compress))
+
+    def flush(self) -> None:
+        """Ожидание записи всех поставленных в очередь отчетов"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Запись оставшихся отчетов и остановка потока"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+
+_default_writer: Optional[ReportWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def get_report_writer() -> ReportWriter:
+    """Общий фоновый писатель отчетов, создается при первом обращении"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = ReportWriter()
+        return _default_writer
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.bench_suite import compare, parse_rows
+from benchmarks.synthetic import make_operations, to_export
+from src.ingestion import parse_operations
+
+ROOT_PATH = Path(__file__).parent.parent
+
+
+def test_make_operations_schema_and_determinism():
+    first = make_operations(1000, cards=3, categories=25, start="2021-01-01", days=30, seed=7)
+    second = make_operations(1000, cards=3, categories=25, start="2021-01-01", days=30, seed=7)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns) == list(pd.read_excel(ROOT_PATH / "data" / "operations.xlsx", nrows=1).columns)
+    assert first["Номер карты"].nunique() == 3
+    assert first["Категория"].nunique() == 25
+    assert first["Дата операции"].is_monotonic_decreasing
+    assert first["Дата операции"].min() >= pd.Timestamp("2021-01-01")
+    assert first["Дата операции"].max() < pd.Timestamp("2021-01-31")
+
+
+def test_to_export_round_trip():
+    operations = make_operations(100, seed=1)
+
+    result = parse_operations(to_export(operations))
+
+    pd.testing.assert_frame_equal(result, operations, check_categorical=False)
+
+
+def test_parse_rows():
+    assert [parse_rows(value) for value in ["10k", "1m", "10M", "2500"]] == [10_000, 1_000_000, 10_000_000, 2500]
+
+
+def test_compare():
+    baselines = {"investment_bank@1000": {"seconds": 1.0, "peak_mb": 10.0}}
+    results = {"investment_bank@1000": {"seconds": 1.2, "peak_mb": 20.0}, "other@1000": {"seconds": 5, "peak_mb": 5}}
+
+    assert compare(results, baselines, 0.25) == ["investment_bank@1000 peak_mb: 10.0 -> 20.0"]
@@ -0,0 +1,204 @@
+import os
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.ingestion import (SOURCE_COLUMN, account_workbooks, compact_transactions, concat_operations, file_fingerprint,
+                           ingest_operations, memory_report, read_accounts, read_operations, row_keys)
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Сумма операции": [-160.89, -64.0],
+        }
+    ).to_excel(file_path, index=False)
+    return file_path
+
+
+def test_read_operations_parses_dates(xlsx_file, tmp_path):
+    result = read_operations(xlsx_file, tmp_path / "cache")
+
+    assert pd.api.types.is_datetime64_any_dtype(result["Дата операции"])
+    assert result["Дата операции"].iloc[0] == pd.Timestamp("2021-12-31 16:44:00")
+
+
+def test_read_operations_uses_cache(xlsx_file, tmp_path):
+    expected = read_operations(xlsx_file, tmp_path / "cache")
+
+    with patch("src.ingestion.pd.read_excel") as mock_read_excel:
+        result = read_operations(xlsx_file, tmp_path / "cache")
+
+    mock_read_excel.assert_not_called()
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_read_operations_touched_file_keeps_cache(xlsx_file, tmp_path):
+    read_operations(xlsx_file, tmp_path / "cache")
+    stat = os.stat(xlsx_file)
+    os.utime(xlsx_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with patch("src.ingestion.pd.read_excel") as mock_read_excel:
+        read_operations(xlsx_file, tmp_path / "cache")
+
+    mock_read_excel.assert_not_called()
+
+
+def test_read_operations_invalidates_on_change(xlsx_file, tmp_path):
+    read_operations(xlsx_file, tmp_path / "cache")
+    pd.DataFrame(
+        {"Дата операции": ["01.01.2022 12:00:00"], "Сумма операции": [-10.0]}
+    ).to_excel(xlsx_file, index=False)
+
+    result = read_operations(xlsx_file, tmp_path / "cache")
+
+    assert len(result) == 1
+    assert result["Сумма операции"].iloc[0] == -10.0
+
+
+def test_file_fingerprint(xlsx_file):
+    result = file_fingerprint(xlsx_file)
+
+    assert result["size"] == os.path.getsize(xlsx_file)
+
+
+def test_compact_transactions():
+    df = pd.DataFrame({
+        "Номер карты": ["*7197", "*7197", "*5091"],
+        "Бонусы (включая кэшбэк)": [3, 0, 1],
+        "MCC": [5411.0, None, 5812.0],
+        "Сумма операции": [-160.89, -64.0, -118.12],
+    })
+
+    result = compact_transactions(df.copy())
+
+    assert isinstance(result["Номер карты"].dtype, pd.CategoricalDtype)
+    assert result["Бонусы (включая кэшбэк)"].dtype == "int8"
+    assert result["MCC"].dtype == "float32"
+    assert result["Сумма операции"].dtype == "float64"
+    assert result.to_dict(orient="records")[0]["Номер карты"] == "*7197"
+
+
+def test_memory_report():
+    df = pd.DataFrame({"Сумма операции": [1.0, 2.0]})
+
+    result = memory_report(df)
+
+    assert result["Сумма операции"] == 16
+    assert result["total"] == sum(size for column, size in result.items() if column != "total")
+
+
+def test_row_keys_stable_and_repeats():
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-31 16:44:00", "2021-12-30 10:00:00"]),
+        "Номер карты": ["*7197", "*7197", "*5091"],
+        "Сумма операции": [-64.0, -64.0, -118.12],
+        "Описание": ["Кафе", "Кафе", "Магнит"],
+    })
+
+    result = row_keys(df)
+
+    assert len(set(result)) == 3
+    assert list(row_keys(compact_transactions(df.copy()))) == list(result)
+    assert list(row_keys(df.iloc[[2]])) == [result[2]]
+
+
+def test_ingest_operations_appends_new_rows(xlsx_file, tmp_path):
+    table, new_rows = ingest_operations(xlsx_file, tmp_path / "cache")
+    assert len(table) == len(new_rows) == 2
+
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 12:00:00", "31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Сумма операции": [-10.0, -160.89, -64.0],
+        }
+    ).to_excel(xlsx_file, index=False)
+    table, new_rows = ingest_operations(xlsx_file, tmp_path / "cache")
+
+    assert list(new_rows["Сумма операции"]) == [-10.0]
+    assert list(table["Сумма операции"]) == [-160.89, -64.0, -10.0]
+
+
+def test_ingest_operations_unchanged_file(xlsx_file, tmp_path):
+    expected, _ = ingest_operations(xlsx_file, tmp_path / "cache")
+
+    with patch("src.ingestion.pd.read_excel") as mock_read_excel:
+        table, new_rows = ingest_operations(xlsx_file, tmp_path / "cache")
+
+    mock_read_excel.assert_not_called()
+    assert new_rows.empty
+    pd.testing.assert_frame_equal(table, expected)
+
+
+def test_ingest_operations_recovers_from_interrupted_write(xlsx_file, tmp_path):
+    ingest_operations(xlsx_file, tmp_path / "cache")
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 12:00:00", "31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Сумма операции": [-10.0, -160.89, -64.0],
+        }
+    ).to_excel(xlsx_file, index=False)
+
+    # Сбой после записи таблицы, но до записи метаданных
+    with patch("src.ingestion._write_meta", side_effect=OSError("disk full")), pytest.raises(OSError):
+        ingest_operations(xlsx_file, tmp_path / "cache")
+    table, new_rows = ingest_operations(xlsx_file, tmp_path / "cache")
+
+    assert new_rows.empty
+    assert list(table["Сумма операции"]) == [-160.89, -64.0, -10.0]
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ["transactions.json", "transactions.pkl"]
+
+
+def test_concat_operations_keeps_categories():
+    first = compact_transactions(pd.DataFrame({"Категория": ["еда", "еда"]}))
+    second = compact_transactions(pd.DataFrame({"Категория": ["транспорт"]}))
+
+    result = concat_operations([first, second])
+
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+    assert list(result["Категория"]) == ["еда", "еда", "транспорт"]
+
+
+@pytest.fixture
+def accounts_dir(tmp_path):
+    dir_path = tmp_path / "accounts"
+    dir_path.mkdir()
+    pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Категория": ["Супермаркеты", "Фастфуд"],
+            "Сумма операции": [-160.89, -64.0],
+        }
+    ).to_excel(dir_path / "7197.xlsx", index=False)
+    pd.DataFrame(
+        {
+            "Дата операции": ["29.12.2021 12:00:00"],
+            "Категория": [None],
+            "Сумма операции": [-10.0],
+        }
+    ).to_excel(dir_path / "5091.xlsx", index=False)
+    return dir_path
+
+
+def test_account_workbooks(accounts_dir, tmp_path):
+    assert [path.name for path in account_workbooks(accounts_dir)] == ["5091.xlsx", "7197.xlsx"]
+    assert account_workbooks(tmp_path / "missing") == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_accounts(accounts_dir, tmp_path, workers):
+    result = read_accounts(accounts_dir, tmp_path / "cache", workers=workers)
+
+    assert list(result[SOURCE_COLUMN]) == ["5091", "7197", "7197"]
+    assert list(result["Сумма операции"]) == [-10.0, -160.89, -64.0]
+    assert isinstance(result["Категория"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(result["Дата операции"])
+
+
+def test_read_accounts_empty_dir(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_accounts(tmp_path, tmp_path / "cache")
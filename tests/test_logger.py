@@ -0,0 +1,63 @@
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.logger import SampledEvents, setup_logging, stop_logging
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    stop_logging()
+    file_path = tmp_path / "app.log"
+    yield file_path
+    stop_logging()
+    logging.getLogger("tests.quiet").setLevel(logging.NOTSET)
+
+
+def test_import_starts_no_log_thread():
+    code = "import threading, src.server; assert threading.active_count() == 1, threading.enumerate()"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+
+
+def test_setup_logging_writes_through_queue(log_file):
+    listener = setup_logging(log_file, levels={"tests.quiet": "WARNING"})
+
+    assert setup_logging() is listener
+    logging.getLogger("tests.loud").info("Сумма %s", 10)
+    logging.getLogger("tests.quiet").info("Не попадет в лог")
+    stop_logging()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "tests.loud - INFO - Сумма 10" in content
+    assert "Не попадет в лог" not in content
+
+
+def test_sampled_events(log_file):
+    setup_logging(log_file, level="DEBUG")
+    logger = logging.getLogger("tests.rows")
+
+    with SampledEvents(logger, "Строки", "сумма %s", every=3) as event:
+        for amount in range(7):
+            event(amount)
+    stop_logging()
+
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert [line.split(" - ")[-1] for line in lines] == [
+        "Строки #1: сумма 0", "Строки #4: сумма 3", "Строки #7: сумма 6", "Строки: всего 7"
+    ]
+
+
+def test_sampled_events_disabled_level_skips_formatting(log_file):
+    setup_logging(log_file, level="INFO")
+
+    class Amount:
+        def __str__(self):
+            raise AssertionError("аргументы не должны форматироваться")
+
+    with SampledEvents(logging.getLogger("tests.rows"), "Строки", "сумма %s", every=1) as event:
+        event(Amount())
+
+    assert event.count == 1
@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.market import fetch_currency_quotes, load_rates_snapshot, rates_cache
+
+
+class StubRatesHandler(BaseHTTPRequestHandler):
+    requests_count = 0
+    quotes = {"USDRUB": 75.0, "USDEUR": 0.9}
+
+    def do_GET(self):
+        StubRatesHandler.requests_count += 1
+        body = json.dumps({"quotes": StubRatesHandler.quotes}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubRatesHandler.requests_count = 0
+    StubRatesHandler.quotes = {"USDRUB": 75.0, "USDEUR": 0.9}
+    server = HTTPServer(("127.0.0.1", 0), StubRatesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/live"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "currency_rates.json"
+    with patch("src.market.path_rates_snapshot", str(path)), patch("src.market.request_retries", 0), \
+            patch("src.market._session", None):
+        rates_cache.clear()
+        yield path
+    rates_cache.clear()
+
+
+def test_fetch_currency_quotes_uses_cache(stub_server, snapshot_path):
+    first = fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+    second = fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+
+    assert first == second == {"USDRUB": 75.0, "USDEUR": 0.9}
+    assert StubRatesHandler.requests_count == 1
+    assert rates_cache.stats()["hits"] == 1
+    assert rates_cache.stats()["misses"] == 1
+
+
+def test_fetch_currency_quotes_saves_snapshot(stub_server, snapshot_path):
+    fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+
+    assert load_rates_snapshot(snapshot_path) == {"USD,EUR": {"USDRUB": 75.0, "USDEUR": 0.9}}
+
+
+def test_fetch_currency_quotes_offline_snapshot(stub_server, snapshot_path):
+    fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+    rates_cache.clear()
+
+    result = fetch_currency_quotes(["USD", "EUR"], url="http://127.0.0.1:9/live")
+
+    assert result == {"USDRUB": 75.0, "USDEUR": 0.9}
+
+
+def test_fetch_currency_quotes_offline_without_snapshot(snapshot_path):
+    with pytest.raises(requests.RequestException):
+        fetch_currency_quotes(["USD", "EUR"], url="http://127.0.0.1:9/live")
+
+
+@pytest.mark.parametrize("partial", [{}, {"USDRUB": 76.0}])
+def test_fetch_currency_quotes_partial_response_keeps_snapshot(stub_server, snapshot_path, partial):
+    fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+    rates_cache.clear()
+    StubRatesHandler.quotes = partial
+
+    first = fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+    second = fetch_currency_quotes(["USD", "EUR"], url=stub_server)
+
+    assert first == second == {"USDRUB": 75.0, "USDEUR": 0.9}
+    assert StubRatesHandler.requests_count == 3
+    assert load_rates_snapshot(snapshot_path) == {"USD,EUR": {"USDRUB": 75.0, "USDEUR": 0.9}}
+    assert [path.name for path in snapshot_path.parent.iterdir()] == [snapshot_path.name]
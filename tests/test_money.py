@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.money import (cashback_kopecks, kopecks_to_rubles, round_rubles, rounding_kopecks, rubles_to_kopecks,
+                       to_kopecks)
+
+
+def test_to_kopecks():
+    result = to_kopecks([160.89, -0.1 - 0.2, np.nan])
+
+    assert result.dtype == np.int64
+    assert list(result) == [16089, -30, 0]
+
+
+def test_rubles_to_kopecks():
+    assert rubles_to_kopecks(118.12) == 11812
+
+
+def test_round_rubles_keeps_missing():
+    result = round_rubles([0.1 + 0.2, np.nan])
+
+    assert result[0] == 0.3
+    assert np.isnan(result[1])
+
+
+@pytest.mark.parametrize("total, expected", [(15699, 156.99), (-5, -0.05), (0, 0.0)])
+def test_kopecks_to_rubles(total, expected):
+    assert kopecks_to_rubles(total) == expected
+
+
+def test_rounding_kopecks():
+    result = rounding_kopecks(np.array([16089, 6400, 10000]), 100)
+
+    assert list(result) == [3911, 3600, 0]
+
+
+def test_cashback_kopecks():
+    result = cashback_kopecks(np.array([-1355750, 1000, 149]))
+
+    assert list(result) == [13558, 10, 1]
@@ -0,0 +1,145 @@
+import json
+import pstats
+import tracemalloc
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.profiling import current_trace, instrumented, stage, trace_request, write_trace
+from src.utils import reload_transactions
+from src.views import _fingerprints, generate_report, generate_reports, invalidate_report_cache
+
+
+@instrumented("test.double")
+def double(frame: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([frame, frame])
+
+
+@pytest.fixture
+def transactions():
+    reload_transactions(pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-01 12:00:00", "2024-01-05 12:00:00"]),
+        "Номер карты": ["*1234", "*1234"],
+        "Сумма операции": [-100.0, -200.0]
+    }))
+    invalidate_report_cache()
+    yield
+    invalidate_report_cache()
+    reload_transactions()
+    _fingerprints.clear()
+
+
+def test_stage_without_trace_records_nothing():
+    assert current_trace() is None
+    with stage("test.idle") as record:
+        assert record is None
+    assert double(pd.DataFrame({"a": [1, 2]})).shape == (4, 1)
+
+
+def test_trace_records_nested_stages_with_rows():
+    with trace_request() as trace:
+        with stage("test.outer"):
+            double(pd.DataFrame({"a": [1, 2, 3]}))
+    assert current_trace() is None
+
+    inner, outer = trace.stages
+    assert (inner["name"], inner["depth"], inner["rows"], inner["rows_out"]) == ("test.double", 1, 3, 6)
+    assert (outer["name"], outer["depth"]) == ("test.outer", 0)
+    assert outer["wall_ms"] >= inner["wall_ms"] >= 0
+    assert trace.to_dict()["wall_ms"] >= outer["wall_ms"]
+
+
+def test_trace_request_starts_at_depth_zero():
+    with trace_request() as outer, stage("test.outer"):
+        with trace_request() as inner, stage("test.inner"):
+            pass
+        with stage("test.after"):
+            pass
+
+    assert not hasattr(inner, "depth")
+    assert [(record["name"], record["depth"]) for record in inner.stages] == [("test.inner", 0)]
+    assert [(record["name"], record["depth"]) for record in outer.stages] == [("test.after", 1), ("test.outer", 0)]
+
+
+def test_trace_request_cprofile_dump(tmp_path):
+    with trace_request("cprofile", tmp_path) as trace:
+        double(pd.DataFrame({"a": [1]}))
+    assert trace.profile_path.endswith(".prof")
+    assert pstats.Stats(trace.profile_path).total_calls > 0
+
+
+def test_trace_request_tracemalloc_snapshot(tmp_path):
+    with trace_request("tracemalloc", tmp_path) as trace:
+        double(pd.DataFrame({"a": list(range(1000))}))
+    assert not tracemalloc.is_tracing()
+    assert trace.peak_kb > 0
+    assert "alloc_kb" in trace.stages[0]
+    assert tracemalloc.Snapshot.load(trace.profile_path).traces
+
+
+def test_trace_request_unknown_profiler():
+    with pytest.raises(ValueError):
+        with trace_request("perf"):
+            pass
+
+
+def test_write_trace_appends_lines(tmp_path):
+    with trace_request() as trace:
+        with stage("test.step"):
+            pass
+    file_path = tmp_path / "traces.jsonl"
+    write_trace(trace, "first", file_path)
+    write_trace(trace, "second", file_path)
+
+    lines = [json.loads(line) for line in file_path.read_text(encoding="utf-8").splitlines()]
+    assert [line["request"] for line in lines] == ["first", "second"]
+    assert lines[0]["stages"][0]["name"] == "test.step"
+
+
+@patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+@patch("src.views.get_stock_prices", return_value=[{"stock": "AAPL", "price": 150.0}])
+@patch("src.views.get_currency_rates", return_value=[{"currency": "USD", "rate": 75.0}])
+def test_generate_report_trace(mock_rates, mock_prices, mock_settings, transactions):
+    plain = json.loads(generate_report("2024-01-05 12:00:00"))
+    invalidate_report_cache()
+    traced = json.loads(generate_report("2024-01-05 12:00:00", trace="report"))
+
+    trace = traced.pop("trace")
+    assert traced == plain
+    names = {record["name"] for record in trace["stages"]}
+    assert {"views.check_sources", "views.cached_analytics", "views.build_analytics",
+            "views.json_dumps", "views.collect_sections"} <= names
+
+
+@patch("src.views.load_user_settings", return_value={"user_currencies": [], "user_stocks": []})
+@patch("src.views.get_stock_prices", return_value=[])
+@patch("src.views.get_currency_rates", return_value=[])
+def test_generate_report_trace_file(mock_rates, mock_prices, mock_settings, transactions, tmp_path):
+    with patch("src.profiling.path_traces", str(tmp_path / "traces.jsonl")):
+        report = json.loads(generate_report("2024-01-05 12:00:00", trace="file"))
+    assert "trace" not in report
+    line = json.loads((tmp_path / "traces.jsonl").read_text(encoding="utf-8"))
+    assert line["request"] == "2024-01-05 12:00:00"
+    assert line["stages"]
+
+    with pytest.raises(ValueError):
+        generate_report("2024-01-05 12:00:00", trace="stdout")
+
+
+def test_generate_reports_market_calls_share_trace(transactions):
+    seen = []
+
+    def rates(currencies):
+        seen.append(current_trace())
+        return [{"currency": "USD", "rate": 75.0}]
+
+    def prices(stocks):
+        seen.append(current_trace())
+        return [{"stock": "AAPL", "price": 150.0}]
+
+    with patch("src.views.get_currency_rates", side_effect=rates), \
+            patch("src.views.get_stock_prices", side_effect=prices), trace_request() as trace:
+        generate_reports([({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}, "2024-01-05 12:00:00")])
+
+    assert seen == [trace, trace]
@@ -4,7 +4,15 @@ import json
 import os
 from datetime import datetime
 from typing import Optional, Callable
-from src.reports import save_report, spending_by_category
+from src.reports import (rolling_spending, save_report, spending_by_categories, spending_by_category,
+                         spending_by_category_batches)
+from src.store import build_category_index
+
+
+@pytest.fixture(autouse=True)
+def report_dir(tmp_path, monkeypatch):
+    # save_report пишет файлы отчетов в текущий каталог
+    monkeypatch.chdir(tmp_path)
 
 
 @pytest.fixture
@@ -47,3 +55,87 @@ def test_save_report_decorator(transactions_data, tmpdir):
     with open(file_name, "r", encoding="utf-8") as file:
         file_content = file.read()
         assert file_content == result
+
+
+def test_spending_by_category_does_not_mutate(transactions_data):
+    expected = transactions_data.copy()
+
+    spending_by_category(transactions_data, "еда", "03.03.2022 14:00:00")
+
+    pd.testing.assert_frame_equal(transactions_data, expected)
+
+
+def test_spending_by_category_sees_in_place_edit(transactions_data):
+    assert len(json.loads(spending_by_category(transactions_data, "еда"))) == 2
+
+    transactions_data.loc[0, "Категория"] = "кино"
+
+    assert len(json.loads(spending_by_category(transactions_data, "еда"))) == 1
+    assert len(json.loads(spending_by_category(transactions_data, "кино"))) == 1
+
+
+def test_spending_by_category_prebuilt_index(transactions_data):
+    category_index = build_category_index(transactions_data)
+
+    result = spending_by_category(transactions_data, "еда", category_index=category_index)
+
+    assert result == spending_by_category(transactions_data, "еда")
+
+
+def test_spending_by_category_date_window(transactions_data):
+    result = json.loads(spending_by_category(transactions_data, "еда", "01.03.2022 00:00:00"))
+
+    assert [item["Сумма"] for item in result] == [100]
+
+
+def test_spending_by_category_unknown(transactions_data):
+    assert spending_by_category(transactions_data, "кино") == "[]"
+
+
+def test_spending_by_categories(transactions_data):
+    result = json.loads(spending_by_categories(transactions_data, ["еда", "транспорт", "кино"]))
+
+    assert [item["Сумма"] for item in result["еда"]] == [100, 150]
+    assert [item["Сумма"] for item in result["транспорт"]] == [200]
+    assert result["кино"] == []
+    assert result["еда"] == json.loads(spending_by_category(transactions_data, "еда"))
+
+
+@pytest.mark.parametrize("date", ["01.04.2022 00:00:00", None])
+def test_spending_by_category_batches(transactions_data, date):
+    batches = [transactions_data.iloc[:2], transactions_data.iloc[2:]]
+
+    result = spending_by_category_batches(batches, "еда", date)
+
+    assert json.loads(result) == json.loads(spending_by_category(transactions_data, "еда", date))
+
+
+@pytest.fixture
+def rolling_data():
+    return pd.DataFrame({
+        "Дата операции": ["05.01.2022 12:00:00", "20.02.2022 13:00:00", "03.03.2022 14:00:00", "10.04.2022 09:00:00",
+                          "10.04.2022 23:59:59", "11.04.2022 00:00:00"],
+        "Категория": ["еда", "транспорт", "еда", "еда", "транспорт", "еда"],
+        "Номер карты": ["*1111", "*2222", "*1111", "*2222", "*2222", "*1111"],
+        "Сумма операции": [-100.1, -200.0, -150.25, -50.0, -10.0, -5.0],
+    })
+
+
+def test_rolling_spending_by_category_matches_spending_by_category(rolling_data):
+    result = rolling_spending(rolling_data, "3M")
+
+    assert list(result.columns) == ["еда", "транспорт"]
+    assert result.index[0] == pd.Timestamp("2022-01-05") and result.index[-1] == pd.Timestamp("2022-04-11")
+    for day in result.index:
+        date = day.strftime("%d.%m.%Y 23:59:59")
+        for category in result.columns:
+            rows = json.loads(spending_by_category.__wrapped__(rolling_data, category, date))
+            assert result.loc[day, category] == pytest.approx(sum(row["Сумма операции"] for row in rows))
+
+
+def test_rolling_spending_by_card_and_window(rolling_data):
+    result = rolling_spending(rolling_data, "30D", by="card", start="09.04.2022", end="12.04.2022")
+
+    assert result.to_dict(orient="list") == {"*1111": [0.0, 0.0, -5.0, -5.0], "*2222": [0.0, -60.0, -60.0, -60.0]}
+    with pytest.raises(ValueError):
+        rolling_spending(rolling_data, by="month")
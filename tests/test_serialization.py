@@ -0,0 +1,78 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_serialization import legacy_categories
+from src.serialization import dumps, frame_json
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", None]),
+        "Сумма операции": [-160.89, np.nan],
+        "Описание": ["Колхоз", "Магнит"],
+    })
+
+
+def test_dumps_matches_json_dumps():
+    report = {"greeting": "Добрый день", "cards": [{"last_digits": "1234", "total_spent": 300.5}], "empty": []}
+
+    assert dumps(report, pretty=True) == json.dumps(report, ensure_ascii=False, indent=4).encode("utf-8")
+    assert dumps(report) == json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def test_dumps_converts_timestamps_numpy_and_nan():
+    value = {
+        "time": pd.Timestamp("2024-01-15 12:00:00"),
+        "day": date(2024, 1, 15),
+        "count": np.int64(3),
+        "share": np.float32(0.5),
+        "flags": np.array([True, False]),
+        "missing": [np.float32("nan"), pd.NaT, pd.NA, None],
+    }
+
+    assert json.loads(dumps(value)) == {
+        "time": "2024-01-15 12:00:00",
+        "day": "2024-01-15",
+        "count": 3,
+        "share": 0.5,
+        "flags": [True, False],
+        "missing": [None, None, None, None],
+    }
+
+
+def test_dumps_arrays_and_series_with_nan():
+    value = {
+        "array": np.array([1.0, np.nan, -np.inf]),
+        "series": pd.Series([np.nan, 2.5]),
+        "dates": pd.Series(pd.to_datetime(["2024-01-15 12:00:00", None])),
+        "ints": np.array([1, 2]),
+    }
+
+    assert dumps(value) == (
+        b'{"array":[1.0,null,null],"series":[null,2.5],"dates":["2024-01-15 12:00:00",null],"ints":[1,2]}'
+    )
+    assert json.loads(dumps(value, pretty=True)) == json.loads(dumps(value))
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_frame_json_matches_to_json(frame):
+    assert frame_json(frame) == frame.to_json(orient="records", force_ascii=False).encode("utf-8")
+    assert json.loads(frame_json(frame, pretty=True)) == json.loads(frame_json(frame))
+
+
+def test_dumps_inserts_frames(frame):
+    windows = {"Супермаркеты": frame, "Пусто": frame.iloc[:0]}
+
+    assert dumps(windows) == legacy_categories(windows)
+    nested = {"report": {"rows": frame, "total": 1}}
+    assert json.loads(dumps(nested, pretty=True)) == json.loads(dumps(nested))
+    assert b'\n            {\n                "' in dumps(nested, pretty=True)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.server import LatencyHistogram, ReportServer
+from src.utils import reload_transactions
+
+
+@pytest.fixture(autouse=True)
+def transactions_data():
+    reload_transactions(pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-01 10:00:00", "2021-11-30 23:59:59"]),
+        "Номер карты": ["*7197", "*7197", "*5091"],
+        "Категория": ["еда", "транспорт", "еда"],
+        "Сумма операции": [-160.89, -100.0, -64.0],
+    }))
+    yield
+    reload_transactions()
+
+
+async def _get(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def _run(*paths):
+    async def scenario():
+        report_server = ReportServer(workers=2)
+        server = await report_server.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(_get(port, path) for path in paths))
+        finally:
+            server.close()
+            await server.wait_closed()
+            report_server.close()
+
+    return asyncio.run(scenario())
+
+
+def test_server_investment_and_category():
+    investment, category = _run(
+        "/investment?month=2021-12&limit=50", "/category?category=%D0%B5%D0%B4%D0%B0&date=31.12.2021%2017:00:00"
+    )
+
+    assert investment == (200, {"month": "2021-12", "total_savings": 39.11})
+    assert category[0] == 200
+    assert [row["Сумма операции"] for row in category[1]] == [-160.89, -64.0]
+
+
+@patch("src.server.build_report", return_value={"greeting": "Добрый вечер"})
+def test_server_report(mock_build_report):
+    (status, body), = _run("/report?datetime=2021-12-31%2018:00:00")
+
+    assert (status, body) == (200, {"greeting": "Добрый вечер"})
+    mock_build_report.assert_called_once_with("2021-12-31 18:00:00")
+
+
+def test_server_errors_and_metrics():
+    not_found, bad_request, health, metrics = _run("/unknown", "/investment", "/health", "/metrics")
+
+    assert not_found[0] == 404
+    assert bad_request[0] == 400
+    assert health == (200, {"status": "ok"})
+    assert metrics[0] == 200
+    assert set(metrics[1]["latency"]) == {"/report", "/investment", "/category"}
+
+
+@pytest.mark.parametrize("path, message", [
+    ("/report", "Не задан параметр datetime"),
+    ("/report?datetime=31.12.2021", "Параметр datetime должен иметь вид 2021-12-31 15:30:00"),
+    ("/investment?month=2021-13", "Параметр month должен иметь вид 2021-10"),
+    ("/investment?month=2021-12&limit=abc", "Параметр limit должен быть положительным целым числом"),
+    ("/investment?month=2021-12&limit=0", "Параметр limit должен быть положительным целым числом"),
+    ("/category?date=31.12.2021", "Не задан параметр category"),
+    ("/category?category=%D0%B5%D0%B4%D0%B0&date=2021-12-31", "Параметр date должен иметь вид 31.12.2018 16:39:04"),
+])
+def test_server_malformed_query(path, message):
+    (status, body), = _run(path)
+
+    assert status == 400
+    assert message in body["error"]
+
+
+@patch("src.server.build_report", side_effect=KeyError("greeting"))
+def test_server_calculation_error(mock_build_report):
+    (status, body), = _run("/report?datetime=2021-12-31%2018:00:00")
+
+    assert (status, body) == (500, {"error": "Внутренняя ошибка"})
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(buckets=(1, 10, 100))
+    for elapsed_ms in [0.5, 3, 4, 50, 500]:
+        histogram.observe(elapsed_ms)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["buckets"] == {"le_1": 1, "le_10": 2, "le_100": 1, "le_inf": 1}
+    assert snapshot["count"] == 5
+    assert snapshot["p50_ms"] == 10.0
+    assert snapshot["p99_ms"] == float("inf")
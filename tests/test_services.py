@@ -1,6 +1,9 @@
 import pytest
 import json
-from src.services import investment_bank
+import numpy as np
+import pandas as pd
+from src.services import (NO_CARD, calculate_rounding_amount, investment_bank, investment_bank_batches,
+                          investment_bank_matrix, rounding_kopecks, to_kopecks)
 
 
 def test_investment_bank():
@@ -12,3 +15,83 @@ def test_investment_bank():
     assert result == expected_result_json
 
 
+def test_investment_bank_dataframe():
+    transactions = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-01 10:00:00", "2021-11-30 23:59:59"]),
+        "Сумма операции": [160.89, 100.0, 64.0]
+    })
+    result = investment_bank("2021-12", transactions, 50)
+    expected_result = {"month": "2021-12", "total_savings": 39.11}
+    assert json.loads(result) == expected_result
+
+
+def test_investment_bank_empty():
+    result = investment_bank("2021-12", [], 10)
+    assert json.loads(result) == {"month": "2021-12", "total_savings": 0.0}
+
+
+@pytest.mark.parametrize("amount, step", [(160.89, 100), (64.0, 10), (118.12, 50), (100.5, 100), (0.01, 10)])
+def test_rounding_kopecks_matches_calculate_rounding_amount(amount, step):
+    result = rounding_kopecks(to_kopecks([amount]), step)[0]
+    assert result == round(calculate_rounding_amount(amount, step) * 100)
+
+
+def test_investment_bank_matrix():
+    transactions = [
+        {"Дата операции": "2021-12-31", "Сумма операции": 160.89},
+        {"Дата операции": "2021-12-31", "Сумма операции": 64.0},
+        {"Дата операции": "2021-11-30", "Сумма операции": 118.12},
+    ]
+    result = json.loads(investment_bank_matrix(transactions, ["2021-11", "2021-12", "2022-01"], [10, 100]))
+    expected_result = {
+        "2021-11": {"10": 1.88, "100": 81.88},
+        "2021-12": {"10": 5.11, "100": 75.11},
+        "2022-01": {"10": 0.0, "100": 0.0},
+    }
+    assert result == expected_result
+
+
+def test_investment_bank_matrix_by_card():
+    transactions = pd.DataFrame({
+        "Дата операции": ["2021-12-31", "2021-12-30", "2021-12-29"],
+        "Сумма операции": [160.89, 64.0, 118.12],
+        "Номер карты": ["*7197", "*5091", "*7197"],
+    })
+    result = json.loads(investment_bank_matrix(transactions, limits=[100], by_card=True))
+    expected_result = {"2021-12": {"*5091": {"100": 36.0}, "*7197": {"100": 120.99}}}
+    assert result == expected_result
+
+
+def test_investment_bank_matrix_by_card_matches_investment_bank():
+    transactions = pd.DataFrame({
+        "Дата операции": ["2021-12-31", "2021-12-30", "2021-12-29", "2021-12-28"],
+        "Сумма операции": [-160.89, -64.0, -118.12, -7.5],
+        "Номер карты": ["*7197", "*5091", "*7197", np.nan],
+    })
+    result = json.loads(investment_bank_matrix(transactions, limits=[10, 100], by_card=True))
+
+    assert set(result["2021-12"]) == {"*5091", "*7197", NO_CARD}
+    cards = transactions["Номер карты"].fillna(NO_CARD)
+    for card, cell in result["2021-12"].items():
+        rows = transactions[cards == card]
+        investment_frame = rows.assign(**{"Сумма операции": rows["Сумма операции"].abs()})
+        for limit, savings in cell.items():
+            assert savings == json.loads(investment_bank("2021-12", investment_frame, int(limit)))["total_savings"]
+
+
+def test_calculate_rounding_amount_exact():
+    assert calculate_rounding_amount(765.576, 1000) == 234.42
+    assert calculate_rounding_amount(160.89, 100) == 39.11
+
+
+def test_investment_bank_batches():
+    transactions = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-01 10:00:00", "2021-11-30 23:59:59"]),
+        "Сумма операции": [-160.89, -100.0, -64.0]
+    })
+    batches = [transactions.iloc[:1], transactions.iloc[1:]]
+
+    result = investment_bank_batches("2021-12", batches, 50)
+
+    expected = transactions.assign(**{"Сумма операции": transactions["Сумма операции"].abs()})
+    assert result == investment_bank("2021-12", expected, 50)
@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.store import (append_time_index, build_card_index, build_category_index, build_time_index, card_totals,
+                       category_positions, extend_card_index, extend_category_index, is_time_indexed, month_to_date,
+                       rolling_totals, trailing_months, window, window_offset)
+
+
+@pytest.fixture
+def transactions_data():
+    data = {
+        "Дата операции": ["31.12.2021 16:44:00", "15.12.2021 10:00:00", "30.11.2021 12:00:00", "01.09.2021 09:00:00"],
+        "Сумма операции": [-160.89, -64.0, -118.12, -50.0],
+    }
+
+    return pd.DataFrame(data)
+
+
+def test_build_time_index(transactions_data):
+    result = build_time_index(transactions_data)
+
+    assert is_time_indexed(result)
+    assert list(result["Сумма операции"]) == [-50.0, -118.12, -64.0, -160.89]
+    assert transactions_data["Дата операции"].iloc[0] == "31.12.2021 16:44:00"
+
+
+def test_is_time_indexed_plain_frame(transactions_data):
+    assert not is_time_indexed(transactions_data)
+
+
+def test_window_is_a_view(transactions_data):
+    indexed = build_time_index(transactions_data)
+
+    result = window(indexed, datetime(2021, 11, 30), datetime(2021, 12, 15, 10))
+
+    assert list(result["Сумма операции"]) == [-118.12, -64.0]
+    assert np.shares_memory(result["Сумма операции"].to_numpy(), indexed["Сумма операции"].to_numpy())
+
+
+def test_month_to_date(transactions_data):
+    indexed = build_time_index(transactions_data)
+
+    result = month_to_date(indexed, datetime(2021, 12, 31, 15, 30))
+
+    assert list(result["Сумма операции"]) == [-64.0]
+
+
+def test_trailing_months(transactions_data):
+    indexed = build_time_index(transactions_data)
+
+    result = trailing_months(indexed, datetime(2021, 12, 31, 17, 0))
+
+    assert list(result["Сумма операции"]) == [-118.12, -64.0, -160.89]
+
+
+def test_build_time_index_shares_sorted_data():
+    transactions = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-15 10:00:00", "2021-11-30 12:00:00"]),
+        "Сумма операции": [-160.89, -64.0, -118.12],
+    })
+
+    result = build_time_index(transactions)
+
+    assert list(result["Сумма операции"]) == [-118.12, -64.0, -160.89]
+    assert np.shares_memory(result["Сумма операции"].to_numpy(), transactions["Сумма операции"].to_numpy())
+    assert is_time_indexed(result)
+
+
+@pytest.fixture
+def appended_data():
+    old = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-01 10:00:00", "2021-11-30 12:00:00", "2021-11-01 09:00:00"]),
+        "Номер карты": ["*7197", "*5091", "*7197"],
+        "Категория": ["еда", "транспорт", "еда"],
+        "Сумма операции": [-64.0, -118.12, -50.0],
+    })
+    new = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-11-15 08:00:00"]),
+        "Номер карты": ["*7197", "*1111"],
+        "Категория": ["кафе", "еда"],
+        "Сумма операции": [-160.89, -10.0],
+    }, index=[3, 4])
+    return old, new
+
+
+def test_append_time_index(appended_data):
+    old, new = appended_data
+
+    result = append_time_index(build_time_index(old), build_time_index(new))
+
+    assert is_time_indexed(result)
+    assert list(result["Сумма операции"]) == [-50.0, -10.0, -118.12, -64.0, -160.89]
+
+
+def test_extend_card_index(appended_data):
+    old, new = appended_data
+    full = pd.concat([old, new])
+
+    result = extend_card_index(build_card_index(build_time_index(old)), build_time_index(new))
+
+    expected = build_card_index(build_time_index(full))
+    start, end = datetime(2021, 11, 10), datetime(2021, 12, 31, 23)
+    assert card_totals(result, start, end) == card_totals(expected, start, end) == {
+        "*1111": -1000, "*5091": -11812, "*7197": -22489
+    }
+
+
+def test_extend_category_index(appended_data):
+    old, new = appended_data
+    full = pd.concat([old, new])
+
+    result = extend_category_index(build_category_index(old), new)
+
+    expected = build_category_index(full)
+    start, end = datetime(2021, 11, 1), datetime(2021, 12, 31, 23)
+    for category in ["еда", "транспорт", "кафе"]:
+        assert list(category_positions(result, category, start, end)) == list(
+            category_positions(expected, category, start, end)
+        )
+    assert list(category_positions(result, "еда", start, end)) == [0, 2, 4]
+
+
+def test_window_offset():
+    assert window_offset("3M") == pd.DateOffset(months=3)
+    assert window_offset(" 90d ") == pd.DateOffset(days=90)
+    assert window_offset("1Y") == pd.DateOffset(years=1)
+    assert window_offset(pd.Timedelta(hours=12)) == pd.Timedelta(hours=12)
+    with pytest.raises(ValueError):
+        window_offset("3 months")
+
+
+def test_rolling_totals_match_window_sums(transactions_data):
+    indexed = build_time_index(transactions_data)
+    dates = indexed.index.to_numpy()
+    prefix = np.concatenate([[0], np.cumsum(np.rint(indexed["Сумма операции"].to_numpy() * 100).astype(np.int64))])
+    ends = pd.date_range("2021-09-01", "2022-01-31", freq="7D") + pd.Timedelta(hours=23)
+    starts = ends - pd.DateOffset(months=3)
+
+    result = rolling_totals(dates, prefix, starts.to_numpy(), ends.to_numpy())
+
+    expected = [round(window(indexed, start, end)["Сумма операции"].sum() * 100) for start, end in zip(starts, ends)]
+    assert result.tolist() == expected
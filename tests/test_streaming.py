@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from src.ingestion import parse_operations
+from src.streaming import iter_chunks, read_xlsx_batches, top_transactions, top_transactions_by
+
+
+@pytest.fixture
+def transactions_data():
+    data = {
+        "Дата операции": ["01.01.2022 12:00:00", "02.01.2022 13:00:00", "03.01.2022 14:00:00",
+                          "04.01.2022 15:00:00", "05.01.2022 16:00:00", "06.01.2022 17:00:00"],
+        "Номер карты": ["*1111", "*2222", "*1111", "*2222", "*1111", "*2222"],
+        "Категория": ["еда", "еда", "транспорт", "еда", "транспорт", "транспорт"],
+        "Сумма операции": [100.0, 500.0, 300.0, 300.0, 50.0, 200.0],
+    }
+
+    return pd.DataFrame(data)
+
+
+def test_iter_chunks(transactions_data):
+    chunks = list(iter_chunks(transactions_data, 4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 6])
+def test_top_transactions_chunked(transactions_data, chunk_size):
+    result = top_transactions(iter_chunks(transactions_data, chunk_size), 3)
+
+    assert [row["Сумма операции"] for row in result] == [500.0, 300.0, 300.0]
+    assert [row["Дата операции"] for row in result][1:] == ["2022-01-04 15:00:00", "2022-01-03 14:00:00"]
+
+
+def test_top_transactions_does_not_mutate(transactions_data):
+    expected = transactions_data.copy()
+
+    top_transactions([transactions_data], 2)
+
+    pd.testing.assert_frame_equal(transactions_data, expected)
+
+
+def test_top_transactions_empty():
+    assert top_transactions([], 5) == []
+
+
+def test_top_transactions_missing_values_are_none(transactions_data):
+    transactions_data.loc[1, "Номер карты"] = None
+    transactions_data["Кешбэк"] = float("nan")
+
+    top = top_transactions([transactions_data], 1)
+
+    assert top[0]["Номер карты"] is None
+    assert top[0]["Кешбэк"] is None
+    assert top[0]["Сумма операции"] == 500.0
+
+
+def test_top_transactions_by(transactions_data):
+    result = top_transactions_by(iter_chunks(transactions_data, 2), ["Номер карты", "Категория"], 1)
+
+    assert result["Номер карты"]["*1111"][0]["Сумма операции"] == 300.0
+    assert result["Номер карты"]["*2222"][0]["Сумма операции"] == 500.0
+    assert result["Категория"]["еда"][0]["Сумма операции"] == 500.0
+    assert result["Категория"]["транспорт"][0]["Дата операции"] == "2022-01-03 14:00:00"
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 10])
+def test_read_xlsx_batches(tmp_path, batch_size):
+    file_path = tmp_path / "operations.xlsx"
+    pd.DataFrame({
+        "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "29.12.2021 09:00:00"],
+        "Сумма операции": [-160.89, -64.0, -118.12],
+        "Бонусы (включая кэшбэк)": [3, 1, 2],
+    }).to_excel(file_path, index=False)
+
+    batches = list(read_xlsx_batches(file_path, batch_size))
+    result = pd.concat(batches, ignore_index=True)
+
+    assert len(batches) == -(-3 // batch_size)
+    pd.testing.assert_frame_equal(result, parse_operations(pd.read_excel(file_path), compact=False))
@@ -224,3 +224,118 @@ def test_convert_date_format_empty_string():
     # Проверка, что вызывается исключение ValueError
     with pytest.raises(ValueError):
         convert_date_format(input_date)
+
+
+def test_reload_transactions_injects_frame():
+    from src import utils
+
+    input_data = pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime(["2021-12-31 16:44:00"]),
+            "Сумма операции": [-160.89],
+        }
+    )
+    utils.reload_transactions(input_data)
+    try:
+        assert utils.get_list_df() is input_data
+        assert utils.list_df is input_data
+        assert utils.list_for_investment == [{"Дата операции": "2021-12-31", "Сумма операции": 160.89}]
+    finally:
+        utils.reload_transactions()
+
+
+def test_lazy_attribute_unknown():
+    from src import utils
+
+    with pytest.raises(AttributeError):
+        utils.unknown_attribute
+
+
+def test_card_stats_batches():
+    from src.utils import calculate_card_stats, card_stats_batches, filter_transactions
+
+    transactions = pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-15 10:00:00", "2021-12-01 12:00:00"]),
+            "Номер карты": ["*7197", "*5091", "*7197"],
+            "Сумма операции": [-160.89, -64.0, -118.12],
+        }
+    )
+    batches = [transactions.iloc[:1], transactions.iloc[1:]]
+
+    result = card_stats_batches(batches, "2021-12-31 17:00:00")
+
+    assert result == calculate_card_stats(filter_transactions(transactions, "2021-12-31 17:00:00"))
+
+
+def test_ingest_transactions_extends_indexes():
+    from src import utils
+    from src.store import build_card_index, build_category_index, card_totals
+
+    old = pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime(["2021-12-15 10:00:00", "2021-12-01 12:00:00"]),
+            "Номер карты": ["*7197", "*7197"],
+            "Категория": ["еда", "транспорт"],
+            "Сумма операции": [-64.0, -118.12],
+        }
+    )
+    new = pd.DataFrame(
+        {
+            "Дата операции": pd.to_datetime(["2021-12-31 16:44:00"]),
+            "Номер карты": ["*5091"],
+            "Категория": ["еда"],
+            "Сумма операции": [-160.89],
+        },
+        index=[2],
+    )
+    utils.reload_transactions(old)
+    try:
+        utils.get_card_index()
+        utils.get_category_index()
+        with patch("src.utils.ingest_operations", return_value=(pd.concat([old, new]), new)):
+            result = utils.ingest_transactions()
+
+        assert result is new
+        assert len(utils.get_list_df()) == 3
+        assert list(utils.get_transaction_index()["Сумма операции"]) == [-118.12, -64.0, -160.89]
+        start, end = pd.Timestamp("2021-12-01"), pd.Timestamp("2021-12-31 23:00:00")
+        assert card_totals(utils.get_card_index(), start, end) == card_totals(
+            build_card_index(utils.get_transaction_index()), start, end
+        )
+        transactions, category_index = utils.get_category_data()
+        expected = build_category_index(transactions)
+        assert list(category_index["categories"]) == list(expected["categories"])
+        assert category_index["order"].tolist() == expected["order"].tolist()
+    finally:
+        utils.reload_transactions()
+
+
+def test_reload_transactions_drops_category_index():
+    from src import utils
+
+    first = pd.DataFrame({"Дата операции": pd.to_datetime(["2021-12-31 16:44:00"]), "Категория": ["еда"]})
+    second = pd.DataFrame({"Дата операции": pd.to_datetime(["2021-12-31 16:44:00"]), "Категория": ["кино"]})
+    utils.reload_transactions(first)
+    try:
+        assert list(utils.get_category_index()["categories"]) == ["еда"]
+        utils.reload_transactions(second)
+        assert utils.get_category_data()[0] is second
+        assert list(utils.get_category_index()["categories"]) == ["кино"]
+    finally:
+        utils.reload_transactions()
+
+
+def test_load_user_settings_logs_only_missing_file(tmp_path, caplog):
+    from src.utils import load_user_settings
+
+    settings_path = tmp_path / "user_settings.json"
+    settings_path.write_text('{"user_currencies": ["USD"]}', encoding="utf-8")
+
+    with caplog.at_level("ERROR"):
+        assert load_user_settings(str(settings_path)) == {"user_currencies": ["USD"]}
+        assert not caplog.records
+        with pytest.raises(FileNotFoundError):
+            load_user_settings(str(tmp_path / "missing.json"))
+
+    assert [record.levelname for record in caplog.records] == ["ERROR"]
@@ -1,4 +1,5 @@
 import pytest
+import time
 from unittest.mock import patch, mock_open
 from datetime import datetime
 import json
@@ -6,10 +7,30 @@ import pandas as pd
 import requests
 import yfinance as yf
 
+from src.store import build_card_index, build_time_index
+from src.utils import get_list_df, reload_transactions
+from src.market import QuoteProvider, YFinanceBatchProvider, YFinanceTickerProvider, rates_cache
+
 from src.views import (
     load_user_settings, get_greeting, filter_transactions, calculate_card_stats,
-    get_top_transactions, get_currency_rates, get_stock_prices, generate_report
+    get_top_transactions, get_currency_rates, get_stock_prices, generate_report, generate_reports,
+    invalidate_report_cache, _fingerprints, get_market_pool, check_sources, cached_analytics, analytics_cache
 )
+from config import market_workers
+
+
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    reload_transactions(pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-01 12:00:00", "2024-01-15 12:00:00"]),
+        "Номер карты": ["*1234", "*1234"],
+        "Сумма операции": [-100.0, -200.0]
+    }))
+    invalidate_report_cache()
+    yield
+    invalidate_report_cache()
+    reload_transactions()
+    _fingerprints.clear()
 
 
 # Тест для функции load_user_settings
@@ -56,8 +77,10 @@ def test_calculate_card_stats():
 
 
 # Тест для функции get_currency_rates
-@patch("requests.get")
-def test_get_currency_rates(mock_get):
+@patch("src.market.save_rates_snapshot")
+@patch("requests.Session.get")
+def test_get_currency_rates(mock_get, mock_save_rates_snapshot):
+    rates_cache.clear()
     mock_response = {
         "quotes": {
             "USDRUB": 75.0,
@@ -74,6 +97,12 @@ def test_get_currency_rates(mock_get):
     assert result == expected
 
 
+@patch("src.utils.fetch_currency_quotes", return_value={"USDEUR": 0.9})
+def test_get_currency_rates_missing_quote(mock_fetch_currency_quotes):
+    with pytest.raises(ValueError, match="RUB"):
+        get_currency_rates(["USD", "EUR"])
+
+
 # Тест для функции get_stock_prices
 @patch("yfinance.Ticker")
 def test_get_stock_prices(mock_ticker):
@@ -81,7 +110,7 @@ def test_get_stock_prices(mock_ticker):
     mock_data = pd.DataFrame({"Close": [150.0]}, index=[datetime(2024, 7, 19)])
     mock_stock.history.return_value = mock_data
     stocks = ["AAPL", "GOOGL"]
-    result = get_stock_prices(stocks)
+    result = get_stock_prices(stocks, YFinanceTickerProvider())
     expected = [
         {'stock': 'AAPL', 'price': 150.0},
         {'stock': 'GOOGL', 'price': 150.0}  # Проверка для двух акций с одинаковыми данными
@@ -89,6 +118,29 @@ def test_get_stock_prices(mock_ticker):
     assert result == expected
 
 
+@patch("yfinance.download")
+def test_get_stock_prices_batch(mock_download):
+    columns = pd.MultiIndex.from_product([["Close", "Open"], ["AAPL", "GOOGL"]])
+    mock_download.return_value = pd.DataFrame(
+        [[150.123, 2700.0, 149.0, 2690.0]], columns=columns, index=[datetime(2024, 7, 19)]
+    )
+    result = get_stock_prices(["AAPL", "GOOGL"], YFinanceBatchProvider())
+    expected = [{'stock': 'AAPL', 'price': 150.12}, {'stock': 'GOOGL', 'price': 2700.0}]
+    assert result == expected
+    mock_download.assert_called_once()
+
+
+class FakeQuoteProvider(QuoteProvider):
+    def get_close_price(self, symbol):
+        return {"AAPL": 150.0, "AMZN": 180.555}[symbol]
+
+
+def test_get_stock_prices_fake_provider():
+    result = get_stock_prices(["AMZN", "AAPL"], FakeQuoteProvider())
+    expected = [{'stock': 'AMZN', 'price': 180.56}, {'stock': 'AAPL', 'price': 150.0}]
+    assert result == expected
+
+
 # Тест для функции generate_report
 @patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
 @patch("src.views.filter_transactions")
@@ -125,3 +177,152 @@ def test_generate_report(mock_read_excel, mock_get_stock_prices, mock_get_curren
     }
 
     assert json.loads(result) == expected
+
+
+def slow_stock_prices(stocks):
+    time.sleep(0.5)
+    return [{'stock': 'AAPL', 'price': 150.0}]
+
+
+@patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+@patch("src.views.get_currency_rates", side_effect=ConnectionError("offline"))
+@patch("src.views.get_stock_prices", side_effect=slow_stock_prices)
+def test_generate_report_partial(mock_get_stock_prices, mock_get_currency_rates, mock_load_user_settings):
+    transactions = pd.DataFrame({
+        "Дата операции": ["01.01.2024 12:00:00", "15.01.2024 12:00:00"],
+        "Номер карты": ["*1234", "*1234"],
+        "Сумма операции": [-100.0, -200.0]
+    })
+
+    result = json.loads(generate_report("2024-01-15 12:00:00", transactions, timeouts={"stock_prices": 0.05}))
+
+    assert result["currency_rates"] == []
+    assert result["stock_prices"] == []
+    assert result["unavailable"] == ["currency_rates", "stock_prices"]
+    assert result["cards"][0]["total_spent"] == -300.0
+
+
+@patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+@patch("src.views.get_currency_rates", return_value=[{'currency': 'USD', 'rate': 75.0}])
+@patch("src.views.get_stock_prices", return_value=[{'stock': 'AAPL', 'price': 150.0}])
+@patch("src.views.build_analytics", return_value={"greeting": "Добрый день", "cards": [], "top_transactions": []})
+def test_generate_report_cached(mock_build_analytics, mock_get_stock_prices, mock_get_currency_rates,
+                                mock_load_user_settings):
+    first = generate_report("2024-01-15 12:00:00")
+    second = generate_report("2024-01-15 12:00:00")
+
+    assert first == second
+    mock_build_analytics.assert_called_once()
+    mock_get_currency_rates.assert_called_once()
+    mock_get_stock_prices.assert_called_once()
+
+
+@patch("src.views.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+@patch("src.views.get_currency_rates", return_value=[{'currency': 'USD', 'rate': 75.0}])
+@patch("src.views.get_stock_prices", return_value=[{'stock': 'AAPL', 'price': 150.0}])
+@patch("src.views.build_analytics", return_value={"greeting": "Добрый день", "cards": [], "top_transactions": []})
+@patch("src.views.ingest_transactions")
+def test_generate_report_invalidated_on_data_change(mock_ingest_transactions, mock_build_analytics,
+                                                    mock_get_stock_prices, mock_get_currency_rates,
+                                                    mock_load_user_settings):
+    generate_report("2024-01-15 12:00:00")
+    with patch("src.views.source_fingerprint", return_value=(1, 1)):
+        generate_report("2024-01-15 12:00:00")
+
+    mock_ingest_transactions.assert_called_once()
+    assert mock_build_analytics.call_count == 2
+    assert mock_get_currency_rates.call_count == 2
+
+
+@patch("src.views.ingest_transactions")
+def test_check_sources_ingests_export_written_after_load(mock_ingest_transactions):
+    reload_transactions()
+    loaded = pd.DataFrame({"Дата операции": pd.to_datetime(["2024-01-01 12:00:00"]), "Сумма операции": [-100.0]})
+    with patch("src.utils.source_fingerprint", return_value=("old",)), \
+            patch("src.utils.load_transactions", return_value=loaded):
+        get_list_df()
+
+    with patch("src.views.source_fingerprint", return_value=("new",)):
+        data_fingerprint, _ = check_sources()
+
+    mock_ingest_transactions.assert_called_once()
+    assert data_fingerprint == ("old",)
+
+
+def test_cached_analytics_disk_cache(tmp_path):
+    with patch("src.views.report_disk_cache", True), patch("src.views.ROOT_PATH", tmp_path):
+        first = cached_analytics("2024-01-15 12:00:00", ("data",))
+        analytics_cache.clear()
+        with patch("src.views.build_analytics") as mock_build_analytics:
+            second = cached_analytics("2024-01-15 12:00:00", ("data",))
+
+    mock_build_analytics.assert_not_called()
+    assert second == first
+    assert [path.suffix for path in tmp_path.rglob("*") if path.is_file()] == [".json"]
+
+
+def test_calculate_card_stats_card_index():
+    transactions = build_time_index(pd.DataFrame({
+        "Дата операции": ["01.01.2024 12:00:00", "10.01.2024 12:00:00", "31.12.2023 12:00:00", "20.01.2024 12:00:00"],
+        "Номер карты": ["*1234", "*5678", "*1234", "*1234"],
+        "Сумма операции": [-100.25, -200.0, -999.0, -0.25]
+    }))
+    filtered = filter_transactions(transactions, "2024-01-15 12:00:00")
+    result = calculate_card_stats(filtered, build_card_index(transactions))
+    expected = [
+        {"Номер карты": "*1234", "total_spent": -100.25, "cashback": 1.0, "last_digits": "1234"},
+        {"Номер карты": "*5678", "total_spent": -200.0, "cashback": 2.0, "last_digits": "5678"}
+    ]
+    assert result == expected
+    assert calculate_card_stats(filtered) == expected
+
+
+def test_calculate_card_stats_cashback_half_up():
+    df = pd.DataFrame({"Номер карты": ["*1234", "*1234"], "Сумма операции": [-13557.0, -0.5]})
+    result = calculate_card_stats(df)
+    assert result[0]["cashback"] == 135.58
+
+
+@patch("src.views.get_currency_rates", return_value=[{'currency': 'USD', 'rate': 75.0}])
+@patch("src.views.get_stock_prices",
+       return_value=[{'stock': 'AAPL', 'price': 150.0}, {'stock': 'TSLA', 'price': 200.0}])
+def test_generate_reports(mock_get_stock_prices, mock_get_currency_rates):
+    requests_batch = [
+        ({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}, "2024-01-15 12:00:00"),
+        ({"user_currencies": ["USD"], "user_stocks": ["TSLA", "AAPL"]}, "2024-01-15 12:00:00"),
+        ({"user_currencies": ["USD"], "user_stocks": []}, "2024-01-10 12:00:00"),
+    ]
+
+    reports, stats = generate_reports(requests_batch, workers=2)
+
+    results = [json.loads(report) for report in reports]
+    mock_get_currency_rates.assert_called_once_with(["USD"])
+    mock_get_stock_prices.assert_called_once_with(["AAPL", "TSLA"])
+    assert [result["stock_prices"] for result in results] == [
+        [{"stock": "AAPL", "price": 150.0}],
+        [{"stock": "TSLA", "price": 200.0}, {"stock": "AAPL", "price": 150.0}],
+        [],
+    ]
+    assert results[0]["cards"][0]["total_spent"] == -300.0
+    assert results[2]["cards"][0]["total_spent"] == -100.0
+    assert stats["reports"] == 3
+    assert stats["reports_per_second"] > 0
+
+
+@patch("src.views.get_currency_rates", side_effect=requests.exceptions.ConnectionError("offline"))
+@patch("src.views.get_stock_prices", return_value=[{'stock': 'AAPL', 'price': 150.0}])
+def test_generate_reports_unavailable(mock_get_stock_prices, mock_get_currency_rates):
+    reports, _ = generate_reports([({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}, "2024-01-15 12:00:00")])
+
+    result = json.loads(reports[0])
+    assert result["currency_rates"] == []
+    assert result["stock_prices"] == [{"stock": "AAPL", "price": 150.0}]
+    assert result["unavailable"] == ["currency_rates"]
+
+
+def test_market_pool_created_lazily():
+    with patch("src.views._market_pool", None):
+        pool = get_market_pool()
+        assert get_market_pool() is pool
+        assert pool._max_workers == market_workers
+    pool.shutdown()
@@ -0,0 +1,84 @@
+import gzip
+import stat
+import threading
+
+import pytest
+
+from src.reports import save_report
+from src.writer import ReportWriter, write_atomic
+
+
+def test_write_atomic(tmp_path):
+    file_path = write_atomic(tmp_path / "report.json", '{"сумма": 1}')
+
+    assert file_path.read_text(encoding="utf-8") == '{"сумма": 1}'
+    assert list(tmp_path.iterdir()) == [file_path]
+
+
+def test_write_atomic_file_mode(tmp_path):
+    plain_path = tmp_path / "plain.json"
+    plain_path.write_text("new", encoding="utf-8")
+    file_path = write_atomic(tmp_path / "report.json", "new")
+    assert stat.S_IMODE(file_path.stat().st_mode) == stat.S_IMODE(plain_path.stat().st_mode)
+
+    file_path.chmod(0o640)
+    write_atomic(file_path, "replaced")
+    assert stat.S_IMODE(file_path.stat().st_mode) == 0o640
+
+
+def test_write_atomic_chunks_and_compress(tmp_path):
+    file_path = write_atomic(tmp_path / "report.json", (part for part in ["[1,", "2]"]), compress=True)
+
+    assert file_path.name == "report.json.gz"
+    with gzip.open(file_path, "rt", encoding="utf-8") as file:
+        assert file.read() == "[1,2]"
+
+
+def test_write_atomic_failure_keeps_old_file(tmp_path):
+    file_path = write_atomic(tmp_path / "report.json", "old")
+
+    def broken_chunks():
+        yield "new"
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        write_atomic(file_path, broken_chunks())
+
+    assert file_path.read_text(encoding="utf-8") == "old"
+    assert list(tmp_path.iterdir()) == [file_path]
+
+
+def test_write_atomic_concurrent(tmp_path):
+    file_path = tmp_path / "report.json"
+    reports = ["a" * 100_000, "b" * 100_000]
+    threads = [threading.Thread(target=write_atomic, args=(file_path, report, False, 1000)) for report in reports * 5]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert file_path.read_text(encoding="utf-8") in reports
+
+
+def test_report_writer_flush_and_close(tmp_path):
+    writer = ReportWriter(maxsize=1)
+    for number in range(5):
+        writer.submit(tmp_path / f"report_{number}.json", str(number))
+    writer.flush()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"report_{number}.json" for number in range(5)]
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(tmp_path / "late.json", "late")
+
+
+def test_save_report_background(tmp_path):
+    writer = ReportWriter()
+    decorated_function = save_report(str(tmp_path / "report.json"), background=True)(lambda: "[]")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("src.reports.get_report_writer", lambda: writer)
+        result = decorated_function()
+    writer.close()
+
+    assert (tmp_path / "report.json").read_text(encoding="utf-8") == result